@@ -0,0 +1,97 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class PerformanceAccumulator:
+    # Running count, mean and variance of performance paths per horizon day, updated batch-wise
+    # (Welford's algorithm in the parallel form of Chan et al.), so that memory does not grow with
+    # the number of ratings. Optionally keeps a uniform reservoir sample of paths to estimate quantiles.
+    def __init__(self, performance_horizon: int, reservoir_size: int = 0, seed: Optional[int] = 0):
+        self.performance_horizon = performance_horizon
+        self.count = 0
+        self.mean = np.zeros(performance_horizon)
+        self._sum_squared_deviations = np.zeros(performance_horizon)
+
+        self.reservoir_size = reservoir_size
+        self._reservoir = np.empty((reservoir_size, performance_horizon))
+        self._generator = np.random.default_rng(seed)
+
+    def update(self, performances: np.ndarray) -> None:
+        # add a single performance path or a (n x performance_horizon) batch of paths
+        performances = np.atleast_2d(performances)
+        batch_count = len(performances)
+        if batch_count == 0:
+            return
+
+        batch_mean = performances.mean(axis=0)
+        batch_sum_squared_deviations = ((performances - batch_mean) ** 2).sum(axis=0)
+        self._combine(batch_count, batch_mean, batch_sum_squared_deviations)
+
+        if self.reservoir_size > 0:
+            self._update_reservoir(performances)
+
+    def merge(self, other: 'PerformanceAccumulator') -> None:
+        # combine with an accumulator over other performances, e.g. computed in another process
+        if other.count > 0:
+            self._combine(other.count, other.mean, other._sum_squared_deviations)
+
+    def _combine(self, count: int, mean: np.ndarray, sum_squared_deviations: np.ndarray) -> None:
+        total_count = self.count + count
+        delta = mean - self.mean
+
+        self.mean = self.mean + delta * count / total_count
+        self._sum_squared_deviations = (
+            self._sum_squared_deviations + sum_squared_deviations + delta ** 2 * self.count * count / total_count
+        )
+        self.count = total_count
+
+    def _update_reservoir(self, performances: np.ndarray) -> None:
+        # reservoir sampling (algorithm R) for a whole batch: the i-th path seen overall replaces
+        # a random entry of the reservoir with probability reservoir_size / (i + 1)
+        num_seen_before = self.count - len(performances)
+        positions = num_seen_before + np.arange(len(performances))
+        slots = np.where(
+            positions < self.reservoir_size,
+            positions,
+            self._generator.integers(0, positions + 1)
+        )
+        is_kept = slots < self.reservoir_size
+        self._reservoir[slots[is_kept]] = performances[is_kept]
+
+    @property
+    def variance(self) -> np.ndarray:
+        if self.count < 2:
+            return np.full(self.performance_horizon, np.nan)
+
+        return self._sum_squared_deviations / (self.count - 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+    @property
+    def sem(self) -> np.ndarray:
+        # standard error of the mean
+        return self.std / np.sqrt(self.count)
+
+    def quantiles(self, quantiles: list[float]) -> np.ndarray:
+        # (len(quantiles) x performance_horizon) estimates from the reservoir sample
+        assert self.reservoir_size > 0, 'Quantiles can only be estimated with a reservoir'
+
+        return np.quantile(self._reservoir[:min(self.count, self.reservoir_size)], quantiles, axis=0)
+
+    def to_frame(self, quantiles: Optional[list[float]] = None) -> pd.DataFrame:
+        summary = pd.DataFrame({
+            'mean': self.mean,
+            'std': self.std,
+            'sem': self.sem,
+            'count': self.count,
+        })
+
+        if quantiles is not None:
+            for quantile, estimates in zip(quantiles, self.quantiles(quantiles)):
+                summary[f'q{quantile:g}'] = estimates
+
+        return summary
@@ -0,0 +1,98 @@
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as t_distribution
+
+from src.instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+# how the ratings are assigned to clusters
+CLUSTER_KEYS = {
+    'ticker': lambda ratings: ratings['Ticker'].to_numpy(),
+    'date': lambda ratings: ratings['Date_datetime'].dt.normalize().to_numpy(),
+    'month': lambda ratings: ratings['Date_datetime'].dt.to_period('M').to_numpy(),
+}
+
+
+def _cluster_variance(influences: np.ndarray, cluster_codes: np.ndarray) -> tuple[np.ndarray, int]:
+    # sum of the influences per cluster, variance as sum of squares with small-sample correction G / (G - 1)
+    num_clusters = int(cluster_codes.max()) + 1
+    cluster_sums = np.zeros((num_clusters, influences.shape[1]))
+    np.add.at(cluster_sums, cluster_codes, influences)
+
+    return (cluster_sums ** 2).sum(axis=0) * num_clusters / (num_clusters - 1), num_clusters
+
+
+@instrumented()
+def clustered_mean_difference(
+        forward_returns: np.ndarray,
+        labels: np.ndarray,
+        ratings: pd.DataFrame,
+        category1: str,
+        category2: str,
+        cluster_by: tuple[str, ...] = ('ticker', 'month'),
+        time_points: Optional[list[int]] = [1, 239]
+) -> pd.DataFrame:
+    # Difference in mean performance of two rating categories with standard errors which are robust
+    # to correlated performances within clusters, e.g. ratings of the same ticker or overlapping horizons
+    # of ratings published in the same month. With two cluster keys, two-way clustering is used
+    # (Cameron, Gelbach & Miller): V = V_1 + V_2 - V_intersection.
+    # `forward_returns` and `labels` have one row per rating in `ratings`.
+    assert 1 <= len(cluster_by) <= 2, 'Clustering is supported along one or two dimensions'
+    if time_points is not None:
+        forward_returns = forward_returns[:, time_points]
+
+    is_selected1, is_selected2 = labels == category1, labels == category2
+    is_selected = is_selected1 | is_selected2
+    performances = forward_returns[is_selected]
+    in_category1 = is_selected1[is_selected]
+    count1, count2 = in_category1.sum(), (~in_category1).sum()
+
+    mean1 = performances[in_category1].mean(axis=0)
+    mean2 = performances[~in_category1].mean(axis=0)
+
+    # influence of each rating on the difference in means
+    influences = np.where(
+        in_category1[:, np.newaxis],
+        (performances - mean1) / count1,
+        -(performances - mean2) / count2,
+    )
+
+    selected_ratings = ratings[is_selected]
+    cluster_codes = [pd.factorize(CLUSTER_KEYS[key](selected_ratings))[0] for key in cluster_by]
+    variance, num_clusters = _cluster_variance(influences, cluster_codes[0])
+
+    if len(cluster_by) == 2:
+        variance2, num_clusters2 = _cluster_variance(influences, cluster_codes[1])
+        intersection_codes = pd.factorize(pd.MultiIndex.from_arrays(cluster_codes))[0]
+        variance_intersection, _ = _cluster_variance(influences, intersection_codes)
+
+        one_way_variance = np.maximum(variance, variance2)
+        variance = variance + variance2 - variance_intersection
+        # the two-way estimate is not guaranteed to be positive, fall back to the larger one-way estimate
+        variance = np.where(variance > 0, variance, one_way_variance)
+        num_clusters = min(num_clusters, num_clusters2)
+
+    standard_errors = np.sqrt(variance)
+    naive_standard_errors = np.sqrt(
+        performances[in_category1].var(axis=0, ddof=1) / count1
+        + performances[~in_category1].var(axis=0, ddof=1) / count2
+    )
+    t_stats = (mean1 - mean2) / standard_errors
+
+    logger.info(f'Clustered ({", ".join(cluster_by)}) mean difference for {category1} / {category2}: '
+                f'{(mean1 - mean2).tolist()}, standard errors {standard_errors.tolist()}')
+
+    return pd.DataFrame({
+        'time_point': time_points if time_points is not None else np.arange(forward_returns.shape[1]),
+        'mean_diff': mean1 - mean2,
+        'std_error': standard_errors,
+        'naive_std_error': naive_standard_errors,
+        't_stat': t_stats,
+        # with few clusters, the t-distribution with G - 1 degrees of freedom is more reliable than the normal
+        'p_value': 2 * t_distribution.sf(np.abs(t_stats), num_clusters - 1),
+        'num_clusters': num_clusters,
+    })
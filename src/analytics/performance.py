@@ -1,116 +1,224 @@
-from collections import defaultdict
-from datetime import datetime, timedelta
-import random
-from typing import Optional
+import logging
+from typing import Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
+from src.analytics.accumulators import PerformanceAccumulator
+from src.api import cache
+from src.api.price_panel import PricePanel
+from src.instrumentation import instrumented
 
-def get_performance_after(
-        dataframe: pd.DataFrame,
-        start_date: datetime,
+logger = logging.getLogger(__name__)
+
+
+@instrumented()
+def compute_forward_returns(
+        ratings: pd.DataFrame,
+        stock_prices: PricePanel,
         performance_horizon: int,
-        value_col: str = 'Close',
-) -> Optional[pd.DataFrame]:
-    # check wether the stock price series starts before the given date
-    assert start_date >= dataframe['Date'].iloc[0], \
-        f'Cannot use rating with date {start_date}, stock price series start at {dataframe["Date"].iloc[0]}'
-
-    # find the index of the row, in which the `Date` is just before `start_date`
-    start_index = dataframe['Date'].searchsorted(start_date, side='left') - 1
-    start_value = dataframe.iloc[start_index][value_col]
-
-    result_df = (
-        dataframe[start_index:start_index + performance_horizon]
-        .assign(
-            change_percent=lambda x: ((x[value_col] - start_value) / start_value) * 100
-        )
-        .reset_index()
-        .loc[:, ['change_percent']]
+        label_col: str = 'Rating_text',
+) -> tuple[np.ndarray, np.ndarray]:
+    # For all ratings at once, compute the performance (change in stock price in %) for each of the
+    # next `performance_horizon` trading days. The baseline is the stock price of the day before the rating.
+    # Returns a (n_ratings x performance_horizon) matrix, whose rows follow the order of `ratings`,
+    # together with the rating category of each row
+    forward_returns = _compute_forward_returns(
+        stock_prices, ratings['Ticker'], ratings['Date_datetime'], performance_horizon
     )
 
-    # Check for data completeness
-    assert len(result_df) == performance_horizon, 'The performance dataframe is too short'
-    total_days = (dataframe.iloc[start_index + performance_horizon]["Date"] - dataframe.iloc[start_index]["Date"]).days + 1
-    row_count = len(result_df)
-    is_complete = row_count >= 0.66 * total_days
-    if not is_complete:
-        print('Many days seem to be missing within the date range')
+    return forward_returns, ratings[label_col].to_numpy()
 
-    return result_df
 
+@instrumented()
+def load_forward_returns(
+        ratings: pd.DataFrame,
+        stock_prices: PricePanel,
+        performance_horizon: int,
+        cache_dir: str = cache.CACHE_DIR
+) -> tuple[np.ndarray, np.ndarray]:
+    # Forward returns of all (ticker, date) pairs computed so far are persisted for each horizon and prices, only
+    # the pairs of newly added ratings are computed and appended. Returns the memory-mapped
+    # (n_pairs x performance_horizon) forward returns and the row of each rating, so that `forward_returns[rows]`
+    # equals the matrix of `compute_forward_returns`. Use `cache.forward_returns_dir` with the fingerprint of
+    # the stock prices to open the same file e.g. in other processes
+    directory = cache.forward_returns_dir(performance_horizon, stock_prices.fingerprint, cache_dir)
+    pairs = pd.MultiIndex.from_arrays([ratings['Ticker'].astype('string'), ratings['Date_datetime']])
+
+    cached_rows, forward_returns = cache.load_forward_returns(directory)
+    rows = pd.MultiIndex.from_frame(cached_rows).get_indexer(pairs)
+
+    new_pairs = pairs[rows < 0].unique()
+    if len(new_pairs) > 0:
+        logger.info(f'Computing forward returns of {len(new_pairs)} new (ticker, date) pairs, '
+                    f'{len(cached_rows)} are cached.')
+        new_tickers, new_dates = new_pairs.get_level_values(0), new_pairs.get_level_values(1)
+        cache.append_forward_returns(
+            directory,
+            pd.DataFrame({'Ticker': new_tickers, 'Date': new_dates}),
+            _compute_forward_returns(stock_prices, new_tickers, new_dates, performance_horizon),
+        )
+        cached_rows, forward_returns = cache.load_forward_returns(directory)
+        rows = pd.MultiIndex.from_frame(cached_rows).get_indexer(pairs)
 
-def get_mean_over_dataframes(dataframes: list[pd.DataFrame]) -> pd.DataFrame:
-    # TODO assert that each dataframe has same index and only one column
-    concatenated = pd.concat(dataframes, axis=1)
-    averaged = concatenated.mean(axis=1)
+    return forward_returns, rows
 
-    return pd.DataFrame(averaged, columns=['mean'])
+
+def _compute_forward_returns(
+        stock_prices: PricePanel,
+        tickers: pd.Series,
+        dates: pd.Series,
+        performance_horizon: int
+) -> np.ndarray:
+    columns = stock_prices.column_of(tickers)
+    assert (columns >= 0).all(), 'Stock prices are missing for some of the rated tickers'
+
+    # for each rating, find the row of the price, whose `Date` is just before the rating date
+    start_rows = stock_prices.row_before(dates)
+    assert (start_rows >= stock_prices.first_valid[columns]).all(), \
+        'Cannot use ratings from before the stock price series of the ticker starts'
+    start_days = stock_prices.trading_day_of(start_rows, columns)
+    assert (start_days + performance_horizon < stock_prices.num_trading_days[columns]).all(), \
+        'The stock price series of some tickers are too short for the performance horizon'
+
+    return _gather_forward_returns(stock_prices, columns, start_rows, performance_horizon)
+
+
+def iter_forward_returns(
+        ratings: pd.DataFrame,
+        stock_prices: PricePanel,
+        performance_horizon: int,
+        block_size: int = 10_000,
+        label_col: str = 'Rating_text',
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    # compute the forward returns block-wise, so that they never need to be held in memory all at once
+    for block_start in range(0, len(ratings), block_size):
+        yield compute_forward_returns(
+            ratings.iloc[block_start:block_start + block_size], stock_prices, performance_horizon, label_col
+        )
+
+
+def _gather_forward_returns(
+        stock_prices: PricePanel,
+        columns: np.ndarray,
+        start_rows: np.ndarray,
+        performance_horizon: int
+) -> np.ndarray:
+    # Gather the price windows of all start rows at once and convert them to changes in % wrt the start price.
+    # A window starts at the last price of the ticker known at the start row and spans the next trading
+    # days of the ticker, i.e. its observed prices, days missing for a ticker are skipped
+    start_days = stock_prices.trading_day_of(start_rows, columns)
+    window_rows = stock_prices.row_of_trading_day(
+        start_days[:, np.newaxis] + np.arange(performance_horizon + 1), columns[:, np.newaxis]
+    )
+    window_values = stock_prices.closes[window_rows[:, :-1], columns[:, np.newaxis]]
+    start_values = window_values[:, :1]
+    forward_returns = (window_values - start_values) / start_values * 100
+
+    # Check for data completeness
+    price_dates = stock_prices.dates.to_numpy()
+    total_days = (
+        (price_dates[window_rows[:, -1]] - price_dates[window_rows[:, 0]]) / np.timedelta64(1, 'D')
+    ) + 1
+    num_incomplete = int((performance_horizon < 0.66 * total_days).sum())
+    if num_incomplete > 0:
+        logger.info(f'Many days seem to be missing within the date range of {num_incomplete} performances.')
+
+    return forward_returns
+
+
+def split_by_label(forward_returns: np.ndarray, labels: np.ndarray) -> dict[str, np.ndarray]:
+    # group the rows of the forward-return matrix by their rating category
+    return {
+        label: forward_returns[labels == label]
+        for label in pd.unique(labels)
+    }
 
 
 def compute_performance_after_ratings(
         ratings: pd.DataFrame,
-        stock_prices: dict[str, pd.DataFrame],
+        stock_prices: PricePanel,
         performance_horizon: int
-) -> defaultdict[str, list[pd.DataFrame]]:
+) -> dict[str, np.ndarray]:
     # For each rating, compute the performance (in terms of change in stock price) for the next year
     # The baseline is the stock price of the day before the rating was published
-    performances_after_rating = defaultdict(list)
+    forward_returns, labels = compute_forward_returns(ratings, stock_prices, performance_horizon)
 
-    for _, rating_entry in ratings.iterrows():
-        company = rating_entry['Ticker']
-        date = rating_entry['Date_datetime']
-        rating_text = rating_entry['Rating_text']
+    return split_by_label(forward_returns, labels)
 
-        performance = get_performance_after(stock_prices[company], date, performance_horizon)
-        if performance is not None:
-            performances_after_rating[rating_text].append(performance)
-
-    return performances_after_rating
 
+@instrumented()
+def compute_performance_any_day(
+        ratings: pd.DataFrame,
+        stock_prices: PricePanel,
+        performance_horizon: int,
+        samples_per_rating: int = 1,
+        seed: Optional[int] = 0
+) -> np.ndarray:
+    # Compute the performance starting from randomly selected days within the year of each rating
+    # For each ticker, the number of random performances equals number of existing ratings (times
+    # `samples_per_rating`) to consider the distribution of ratings across companies in the mean later
+    generator = np.random.default_rng(seed)
+    columns = np.repeat(stock_prices.column_of(ratings['Ticker']), samples_per_rating)
+    assert (columns >= 0).all(), 'Stock prices are missing for some of the rated tickers'
+    rating_dates = np.repeat(ratings['Date_datetime'].to_numpy(dtype='datetime64[D]'), samples_per_rating)
+
+    # Random days are drawn from the year of the rating, but after the first known price (a price before the
+    # random day is needed as baseline) and early enough to observe the full performance horizon. The rating
+    # date itself is always a valid day, e.g. if the last valid day is before the first trading day of the year
+    price_dates = stock_prices.dates.to_numpy(dtype='datetime64[D]')
+    year_start = rating_dates.astype('datetime64[Y]').astype('datetime64[D]')
+    year_end = (rating_dates.astype('datetime64[Y]') + 1).astype('datetime64[D]') - 1
+    earliest_day = np.maximum(year_start, price_dates[stock_prices.first_valid[columns]] + 1)
+    latest_start_rows = stock_prices.row_of_trading_day(
+        stock_prices.num_trading_days[columns] - 1 - performance_horizon, columns
+    )
+    latest_day = np.maximum(np.minimum(year_end, price_dates[latest_start_rows] + 1), rating_dates)
+    assert (earliest_day <= latest_day).all(), 'Stock prices are too short to draw random days for some ratings'
 
-def random_date_within_year(date, earliest_date: datetime):
-    year_start = datetime(date.year, 1, 1)
-    year_end = datetime(date.year + 1, 1, 1) - timedelta(days=1)
-    if earliest_date.year == year_start.year:
-        year_start = earliest_date
+    random_offsets = generator.integers(0, (latest_day - earliest_day).astype(np.int64) + 1)
+    start_rows = stock_prices.row_before(earliest_day + random_offsets)
 
-    random_days = random.randint(0, (year_end - year_start).days)
-    return year_start + timedelta(days=random_days)
+    return _gather_forward_returns(stock_prices, columns, start_rows, performance_horizon)
 
 
-def compute_performance_any_day(
+@instrumented()
+def accumulate_performance_after_ratings(
         ratings: pd.DataFrame,
-        stock_prices: dict[str, pd.DataFrame],
-        performance_horizon: int
-) -> list[pd.DataFrame]:
-    # Compute the performance starting from randomly selected days
-    # For each ticker, the number of random performances equals number of existing ratings
-    # to consider the distribution of ratings across companies in the mean later
-    performances_any_day = []
-    ratings_per_company = ratings['Ticker'].value_counts().to_dict()
-
-    for company, num_ratings in ratings_per_company.items():
-        first_stock_price = stock_prices[company]['Date'].min()
-        random_dates = (
-            ratings[ratings['Ticker'] == company]['Date_datetime']
-            .apply(random_date_within_year, earliest_date=first_stock_price).tolist()
-        )
+        stock_prices: PricePanel,
+        performance_horizon: int,
+        block_size: int = 10_000,
+        reservoir_size: int = 0
+) -> dict[str, PerformanceAccumulator]:
+    # streaming alternative to `compute_performance_after_ratings` with memory independent of the number of ratings
+    accumulators = dict()
 
-        for random_date in random_dates:
-            performances_any_day.append(
-                get_performance_after(stock_prices[company], random_date, performance_horizon)
-            )
+    for forward_returns, labels in iter_forward_returns(ratings, stock_prices, performance_horizon, block_size):
+        for label, performances in split_by_label(forward_returns, labels).items():
+            if label not in accumulators:
+                accumulators[label] = PerformanceAccumulator(performance_horizon, reservoir_size=reservoir_size)
+            accumulators[label].update(performances)
 
-    return performances_any_day
+    return accumulators
 
 
+@instrumented()
 def compute_mean_performance_after_rating(
-        performances_after_rating: dict[str, list[pd.DataFrame]]
+        performances_after_rating: dict[str, np.ndarray],
+        block_size: int = 10_000,
+        quantiles: Optional[list[float]] = None
 ) -> dict[str, pd.DataFrame]:
-    mean_performance_after_rating = {
-        rating_text: get_mean_over_dataframes(performances)
-        for rating_text, performances in performances_after_rating.items()
-    }
+    # Mean, standard deviation, standard error and count (and optionally quantiles) per horizon day,
+    # aggregated block-wise for each rating category
+    mean_performance_after_rating = dict()
+
+    for rating_text, performances in performances_after_rating.items():
+        accumulator = PerformanceAccumulator(
+            performances.shape[1], reservoir_size=len(performances) if quantiles is not None else 0
+        )
+        for block_start in range(0, len(performances), block_size):
+            accumulator.update(performances[block_start:block_start + block_size])
+
+        mean_performance_after_rating[rating_text] = accumulator.to_frame(quantiles)
 
     return mean_performance_after_rating
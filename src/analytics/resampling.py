@@ -0,0 +1,177 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import logging
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+
+def _bootstrap_block(
+        performances1: np.ndarray,
+        performances2: np.ndarray,
+        num_resamples: int,
+        seed_sequence: np.random.SeedSequence
+) -> np.ndarray:
+    # Differences in mean for a block of bootstrap resamples. Each resample is represented by how often
+    # each performance was drawn, so that the means of the whole block are a single matrix product
+    generator = np.random.default_rng(seed_sequence)
+
+    def resampled_means(performances: np.ndarray) -> np.ndarray:
+        count = len(performances)
+        assert num_resamples * count < 2 ** 31, 'Reduce the block size, draws are indexed with 32-bit integers'
+        draws = generator.integers(0, count, size=(num_resamples, count), dtype=np.int32)
+        draws += np.arange(0, num_resamples * count, count, dtype=np.int32)[:, np.newaxis]
+        draw_counts = np.bincount(draws.ravel(), minlength=num_resamples * count).reshape(num_resamples, count)
+        return draw_counts @ performances / count
+
+    return resampled_means(performances1) - resampled_means(performances2)
+
+
+def _permutation_block(
+        performances1: np.ndarray,
+        performances2: np.ndarray,
+        num_resamples: int,
+        seed_sequence: np.random.SeedSequence
+) -> np.ndarray:
+    # Differences in mean for a block of random relabelings of the pooled performances.
+    # Only the members of the smaller group are drawn, the other group consists of the remaining performances
+    generator = np.random.default_rng(seed_sequence)
+    pooled = np.concatenate([performances1, performances2])
+    count1, count2 = len(performances1), len(performances2)
+
+    members = np.stack([
+        generator.choice(len(pooled), min(count1, count2), replace=False, shuffle=False)
+        for _ in range(num_resamples)
+    ])
+    is_member = np.zeros((num_resamples, len(pooled)))
+    np.put_along_axis(is_member, members, 1.0, axis=1)
+
+    member_sums = is_member @ pooled
+    sums1 = member_sums if count1 <= count2 else pooled.sum(axis=0) - member_sums
+    return sums1 / count1 - (pooled.sum(axis=0) - sums1) / count2
+
+
+def _resample(
+        block_function: Callable,
+        performances1: np.ndarray,
+        performances2: np.ndarray,
+        num_resamples: int,
+        block_size: int,
+        seed: Optional[int],
+        max_workers: int
+) -> np.ndarray:
+    # Run the resampling in blocks, each with its own seed derived from `seed`, so that the results
+    # do not depend on whether the blocks are computed sequentially or in a process pool
+    block_sizes = [min(block_size, num_resamples - start) for start in range(0, num_resamples, block_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    arguments = (
+        [performances1] * len(block_sizes), [performances2] * len(block_sizes), block_sizes, seed_sequences
+    )
+
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            blocks = list(executor.map(block_function, *arguments))
+    else:
+        blocks = list(map(block_function, *arguments))
+
+    return np.concatenate(blocks)
+
+
+def _select_time_points(performances: np.ndarray, time_points: Optional[list[int]]) -> np.ndarray:
+    return performances if time_points is None else performances[:, time_points]
+
+
+@instrumented()
+def bootstrap_mean_difference(
+        performances1: np.ndarray,
+        performances2: np.ndarray,
+        time_points: Optional[list[int]] = [1, 239],
+        num_resamples: int = 10_000,
+        confidence_level: float = 0.95,
+        block_size: int = 100,
+        seed: Optional[int] = 0,
+        max_workers: int = 1
+) -> pd.DataFrame:
+    # Percentile bootstrap confidence interval for the difference in mean performance of two rating categories
+    # at the given time points (all days of the performance horizon if `time_points` is None)
+    performances1 = _select_time_points(performances1, time_points)
+    performances2 = _select_time_points(performances2, time_points)
+
+    mean_diffs = _resample(
+        _bootstrap_block, performances1, performances2, num_resamples, block_size, seed, max_workers
+    )
+    alpha = 1 - confidence_level
+
+    return pd.DataFrame({
+        'time_point': time_points if time_points is not None else np.arange(performances1.shape[1]),
+        'mean_diff': performances1.mean(axis=0) - performances2.mean(axis=0),
+        'std_error': mean_diffs.std(axis=0, ddof=1),
+        'ci_lower': np.quantile(mean_diffs, alpha / 2, axis=0),
+        'ci_upper': np.quantile(mean_diffs, 1 - alpha / 2, axis=0),
+    })
+
+
+@instrumented()
+def permutation_test_mean_difference(
+        performances1: np.ndarray,
+        performances2: np.ndarray,
+        time_points: Optional[list[int]] = [1, 239],
+        num_resamples: int = 10_000,
+        block_size: int = 100,
+        seed: Optional[int] = 0,
+        max_workers: int = 1
+) -> pd.DataFrame:
+    # Two-sided permutation test of the null hypothesis that both rating categories have the same
+    # distribution of performances, using the difference in mean as test statistic
+    performances1 = _select_time_points(performances1, time_points)
+    performances2 = _select_time_points(performances2, time_points)
+
+    observed_diff = performances1.mean(axis=0) - performances2.mean(axis=0)
+    permuted_diffs = _resample(
+        _permutation_block, performances1, performances2, num_resamples, block_size, seed, max_workers
+    )
+    num_as_extreme = (np.abs(permuted_diffs) >= np.abs(observed_diff)).sum(axis=0)
+
+    return pd.DataFrame({
+        'time_point': time_points if time_points is not None else np.arange(performances1.shape[1]),
+        'mean_diff': observed_diff,
+        'p_value': (num_as_extreme + 1) / (num_resamples + 1),
+    })
+
+
+def perform_resampling_tests(
+        performance_after_rating: dict[str, np.ndarray],
+        time_points: Optional[list[int]] = [1, 239],
+        num_resamples: int = 10_000,
+        confidence_level: float = 0.95,
+        seed: Optional[int] = 0,
+        max_workers: int = 1
+) -> pd.DataFrame:
+    # Bootstrap confidence intervals and permutation tests between each pair of ratings categories,
+    # which do not rely on approximately normally distributed performances like the t-test
+    results = []
+
+    for cat1, cat2 in combinations(performance_after_rating.keys(), 2):
+        performances1, performances2 = performance_after_rating[cat1], performance_after_rating[cat2]
+        bootstrap = bootstrap_mean_difference(
+            performances1, performances2, time_points, num_resamples, confidence_level,
+            seed=seed, max_workers=max_workers
+        )
+        permutation_test = permutation_test_mean_difference(
+            performances1, performances2, time_points, num_resamples, seed=seed, max_workers=max_workers
+        )
+
+        results.append(
+            bootstrap
+            .assign(p_value=permutation_test['p_value'], category1=cat1, category2=cat2)
+            .loc[:, ['category1', 'category2', 'time_point', 'mean_diff', 'std_error', 'ci_lower', 'ci_upper',
+                     'p_value']]
+        )
+        logger.info(f'Permutation test for {cat1} / {cat2}: {permutation_test["p_value"].tolist()}')
+
+    return pd.concat(results, ignore_index=True)
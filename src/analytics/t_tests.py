@@ -1,39 +1,101 @@
 from itertools import combinations
 import logging
-import statistics
+from typing import Optional, Union
 
+import numpy as np
 import pandas as pd
-from scipy.stats import ttest_ind
+from scipy.stats import t as t_distribution
+
+from src.analytics.accumulators import PerformanceAccumulator
+from src.instrumentation import instrumented
 
 logger = logging.getLogger(__name__)
 
 
+def _summary_statistics(
+        performances: Union[np.ndarray, PerformanceAccumulator],
+        time_points: Optional[list[int]]
+) -> tuple[np.ndarray, np.ndarray, int]:
+    # mean, variance and count per time point, either from the performance matrix or from an accumulator
+    if isinstance(performances, PerformanceAccumulator):
+        mean, variance, count = performances.mean, performances.variance, performances.count
+    else:
+        mean, variance, count = performances.mean(axis=0), performances.var(axis=0, ddof=1), len(performances)
+
+    if time_points is not None:
+        mean, variance = mean[time_points], variance[time_points]
+
+    return mean, variance, count
+
+
+def adjust_p_values(p_values: np.ndarray, method: str) -> np.ndarray:
+    # Multiple-comparison correction over all given p-values. NaN p-values (e.g. of a category with a single
+    # rating) are no tests and stay NaN
+    p_values = np.asarray(p_values, dtype=np.float64)
+    is_finite = np.isfinite(p_values)
+    num_tests = int(is_finite.sum())
+    order = np.argsort(p_values[is_finite])
+    sorted_p_values = p_values[is_finite][order]
+
+    if method == 'bonferroni':
+        adjusted = sorted_p_values * num_tests
+    elif method == 'holm':
+        adjusted = np.maximum.accumulate(sorted_p_values * (num_tests - np.arange(num_tests)))
+    elif method == 'fdr_bh':
+        # Benjamini-Hochberg
+        adjusted = np.minimum.accumulate((sorted_p_values * num_tests / np.arange(1, num_tests + 1))[::-1])[::-1]
+    else:
+        raise ValueError(f"Unknown correction method '{method}', use 'bonferroni', 'holm' or 'fdr_bh'.")
+
+    adjusted_finite = np.empty(num_tests)
+    adjusted_finite[order] = np.minimum(adjusted, 1.0)
+    adjusted_p_values = np.full(len(p_values), np.nan)
+    adjusted_p_values[is_finite] = adjusted_finite
+
+    return adjusted_p_values
+
+
+@instrumented()
 def perform_t_tests(
-        performance_after_rating: dict[str, pd.DataFrame],
-        time_points: list[int] = [1, 239]
-) -> None:
-    # Perform two-sample t-test between each pair of ratings categories
-    rating_categories = list(performance_after_rating.keys())
-
-    for cat1, cat2 in combinations(rating_categories, 2):
-        p_values = []
-        mean_diffs = []
-
-        for time_point in time_points:
-            # get performances (return wrt day 0 in % ) for both categories
-            performances1 = [
-                df.loc[time_point, 'change_percent']
-                for df in performance_after_rating[cat1]
-            ]
-            performances2 = [
-                df.loc[time_point, 'change_percent']
-                for df in performance_after_rating[cat2]
-            ]
-
-            # t-test to establish whether the two performance lists stem from two different groups
-            # Set equal_var=False for Welch’s t-test, since performances can be assumed to be indepdendent
-            t_stat, p_value = ttest_ind(performances1, performances2, equal_var=False)
-            p_values.append(p_value)
-            mean_diffs.append(statistics.mean(performances1) - statistics.mean(performances2))
-
-        logger.info(f't-test for {cat1} / {cat2}: {p_values}, {mean_diffs}')
+        performance_after_rating: dict[str, Union[np.ndarray, PerformanceAccumulator]],
+        time_points: Optional[list[int]] = [1, 239],
+        correction: Optional[str] = None
+) -> pd.DataFrame:
+    # Perform two-sample t-test between each pair of ratings categories at all time points at once
+    # (all days of the performance horizon if `time_points` is None).
+    # Welch's t-test is used (no equal variances assumed), since performances can be assumed to be independent
+    statistics = {
+        category: _summary_statistics(performances, time_points)
+        for category, performances in performance_after_rating.items()
+    }
+    results = []
+
+    for cat1, cat2 in combinations(statistics.keys(), 2):
+        mean1, variance1, count1 = statistics[cat1]
+        mean2, variance2, count2 = statistics[cat2]
+
+        squared_errors1, squared_errors2 = variance1 / count1, variance2 / count2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t_stats = (mean1 - mean2) / np.sqrt(squared_errors1 + squared_errors2)
+            degrees_of_freedom = (squared_errors1 + squared_errors2) ** 2 / (
+                squared_errors1 ** 2 / (count1 - 1) + squared_errors2 ** 2 / (count2 - 1)
+            )
+        p_values = 2 * t_distribution.sf(np.abs(t_stats), degrees_of_freedom)
+
+        results.append(pd.DataFrame({
+            'category1': cat1,
+            'category2': cat2,
+            'time_point': time_points if time_points is not None else np.arange(len(mean1)),
+            'mean_diff': mean1 - mean2,
+            't_stat': t_stats,
+            'degrees_of_freedom': degrees_of_freedom,
+            'p_value': p_values,
+        }))
+
+        logger.info(f't-test for {cat1} / {cat2}: {p_values.tolist()}, {(mean1 - mean2).tolist()}')
+
+    t_tests = pd.concat(results, ignore_index=True)
+    if correction is not None:
+        t_tests['p_value_adjusted'] = adjust_p_values(t_tests['p_value'].to_numpy(), correction)
+
+    return t_tests
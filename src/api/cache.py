@@ -0,0 +1,206 @@
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .price_panel import PricePanel
+
+logger = logging.getLogger(__name__)
+
+# Increase the version whenever the layout or the cleaning of cached data changes,
+# so that entries written by older code are never read again
+CACHE_VERSION = 5
+CACHE_DIR = os.path.join('data', 'cache')
+
+
+def cache_key(**params) -> str:
+    # stable hash over the parameters the cached data depends on
+    serialized = json.dumps({'version': CACHE_VERSION, **params}, sort_keys=True, default=str)
+
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
+
+
+def file_fingerprint(file_path: str) -> dict:
+    # changes of the source file (e.g. newly collected ratings) invalidate entries derived from it
+    stat = os.stat(file_path)
+
+    return {'path': os.path.abspath(file_path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def clear_cache(cache_dir: str = CACHE_DIR) -> None:
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    elif os.path.isfile(cache_dir):
+        os.remove(cache_dir)  # unkeyed pickle written by earlier versions
+
+    logger.info(f'Cleared cache in {cache_dir}')
+
+
+def _ensure_dir(path: str) -> None:
+    if os.path.isfile(os.path.dirname(path)):
+        # `data/cache` used to be a single pickle file without any key, which can not be trusted
+        logger.info('Removing unkeyed cache file written by an earlier version')
+        os.remove(os.path.dirname(path))
+    os.makedirs(path, exist_ok=True)
+
+
+def load_ratings(key: str, cache_dir: str = CACHE_DIR) -> Optional[pd.DataFrame]:
+    file_path = os.path.join(cache_dir, 'ratings', f'{key}.parquet')
+    if not os.path.exists(file_path):
+        return None
+
+    return pd.read_parquet(file_path)
+
+
+def save_ratings(key: str, ratings: pd.DataFrame, cache_dir: str = CACHE_DIR) -> None:
+    directory = os.path.join(cache_dir, 'ratings')
+    _ensure_dir(directory)
+    ratings.to_parquet(os.path.join(directory, f'{key}.parquet'))
+
+
+def save_price_panel(
+        panel: PricePanel,
+        start_date: datetime,
+        provider: dict,
+        cache_dir: str = CACHE_DIR
+) -> str:
+    # Each array is stored as a separate .npy file, so that prices can be memory-mapped when loading.
+    # `provider` is the identity of the price provider the prices were downloaded from
+    key = cache_key(tickers=sorted(panel.tickers), start_date=start_date, provider=provider)
+    directory = os.path.join(cache_dir, 'prices', key)
+    _ensure_dir(directory)
+
+    np.save(os.path.join(directory, 'closes.npy'), np.ascontiguousarray(panel.closes))
+    np.save(os.path.join(directory, 'dates.npy'), panel.dates.to_numpy(dtype='datetime64[ns]'))
+    np.save(os.path.join(directory, 'first_valid.npy'), panel.first_valid)
+    np.save(os.path.join(directory, 'last_valid.npy'), panel.last_valid)
+    np.save(os.path.join(directory, 'is_observed.npy'), np.ascontiguousarray(panel.is_observed))
+
+    # the metadata is written last and marks the entry as complete
+    with open(os.path.join(directory, 'meta.json'), 'w') as file:
+        json.dump({
+            'version': CACHE_VERSION,
+            'start_date': start_date.isoformat(),
+            'provider': cache_key(**provider),
+            'fingerprint': panel.fingerprint,
+            'end_date': panel.dates[-1].isoformat() if len(panel.dates) > 0 else None,
+            'downloaded_at': datetime.now().isoformat(),
+            'tickers': list(panel.tickers),
+        }, file)
+
+    return key
+
+
+def _load_price_panel(directory: str, tickers: list[str], fingerprint: str) -> PricePanel:
+    return PricePanel.from_arrays(
+        dates=np.load(os.path.join(directory, 'dates.npy')),
+        tickers=tickers,
+        closes=np.load(os.path.join(directory, 'closes.npy'), mmap_mode='r'),
+        first_valid=np.load(os.path.join(directory, 'first_valid.npy')),
+        last_valid=np.load(os.path.join(directory, 'last_valid.npy')),
+        is_observed=np.load(os.path.join(directory, 'is_observed.npy'), mmap_mode='r'),
+        fingerprint=fingerprint,
+    )
+
+
+def find_price_panel(
+        tickers: list[str],
+        start_date: datetime,
+        end_date: datetime,
+        provider: dict,
+        cache_dir: str = CACHE_DIR
+) -> Optional[PricePanel]:
+    # Reuse the most recently downloaded panel of the same price provider which covers all requested tickers
+    # from `start_date` until `end_date`, e.g. the prices cached for a wider range of years, and restrict it
+    # to the request. A panel downloaded after `end_date` covers it as well, as no later prices were known
+    prices_dir = os.path.join(cache_dir, 'prices')
+    if not os.path.isdir(prices_dir):
+        return None
+
+    candidates = []
+    for key in os.listdir(prices_dir):
+        meta_path = os.path.join(prices_dir, key, 'meta.json')
+        if not os.path.exists(meta_path):
+            continue
+
+        with open(meta_path) as file:
+            meta = json.load(file)
+
+        if meta['version'] != CACHE_VERSION or datetime.fromisoformat(meta['start_date']) > start_date:
+            continue
+        if meta['provider'] != cache_key(**provider):
+            continue
+        downloaded_at = datetime.fromisoformat(meta['downloaded_at'])
+        last_date = datetime.fromisoformat(meta['end_date']) if meta['end_date'] is not None else None
+        if downloaded_at < end_date and (last_date is None or last_date < end_date):
+            continue
+        if not set(tickers).issubset(meta['tickers']):
+            continue
+
+        candidates.append((downloaded_at, key, meta))
+
+    if len(candidates) == 0:
+        return None
+
+    _, key, meta = max(candidates, key=lambda candidate: candidate[0])
+    logger.info(f'Reusing cached stock prices {key} downloaded at {meta["downloaded_at"]}')
+    price_panel = _load_price_panel(os.path.join(prices_dir, key), meta['tickers'], meta['fingerprint'])
+
+    return price_panel.subset(tickers, start_date)
+
+
+def forward_returns_dir(performance_horizon: int, prices_fingerprint: str, cache_dir: str = CACHE_DIR) -> str:
+    # Forward returns are keyed by the fingerprint of the price panel they are computed from (see
+    # `PricePanel.fingerprint`), so that they are computed again once the prices change, e.g. with
+    # another price provider or after downloading the prices again
+    return os.path.join(
+        cache_dir,
+        'forward_returns',
+        cache_key(performance_horizon=performance_horizon, prices=prices_fingerprint)
+    )
+
+
+def load_forward_returns(directory: str) -> tuple[pd.DataFrame, Optional[np.ndarray]]:
+    # (Ticker, Date) of each row and the memory-mapped (n_rows x horizon) forward returns, empty if nothing is cached
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path):
+        return pd.DataFrame({'Ticker': pd.Series(dtype='string'), 'Date': pd.Series(dtype='datetime64[ns]')}), None
+
+    with open(meta_path) as file:
+        meta = json.load(file)
+
+    # rows and returns beyond the committed number of rows were written by an interrupted append
+    rows = pd.read_parquet(os.path.join(directory, 'rows.parquet')).iloc[:meta['num_rows']]
+    forward_returns = np.memmap(
+        os.path.join(directory, 'returns.f64'), dtype=np.float64, mode='r', shape=(meta['num_rows'], meta['horizon'])
+    ) if meta['num_rows'] > 0 else np.empty((0, meta['horizon']))
+
+    return rows, forward_returns
+
+
+def append_forward_returns(directory: str, rows: pd.DataFrame, forward_returns: np.ndarray) -> None:
+    # Append the forward returns of new (Ticker, Date) rows. The returns are appended to a raw float64 file,
+    # so that previously cached rows are never rewritten. The metadata is written last and commits the append
+    _ensure_dir(directory)
+    cached_rows, _ = load_forward_returns(directory)
+    num_rows = len(cached_rows) + len(rows)
+
+    returns_path = os.path.join(directory, 'returns.f64')
+    with open(returns_path, 'ab') as file:
+        file.truncate(len(cached_rows) * forward_returns.shape[1] * 8)
+        file.write(np.ascontiguousarray(forward_returns, dtype=np.float64).tobytes())
+
+    temporary_path = os.path.join(directory, 'rows.parquet.tmp')
+    pd.concat([cached_rows, rows[['Ticker', 'Date']]], ignore_index=True).to_parquet(temporary_path)
+    os.replace(temporary_path, os.path.join(directory, 'rows.parquet'))
+
+    temporary_path = os.path.join(directory, 'meta.json.tmp')
+    with open(temporary_path, 'w') as file:
+        json.dump({'version': CACHE_VERSION, 'num_rows': num_rows, 'horizon': forward_returns.shape[1]}, file)
+    os.replace(temporary_path, os.path.join(directory, 'meta.json'))
@@ -1,75 +1,131 @@
 from datetime import datetime, timedelta
 import logging
 import os
-import pickle
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+from src.api import cache
+from src.api.price_panel import PricePanel
+from src.api.price_providers import PriceProvider, YFinanceProvider
+from src.api.price_store import PriceStore
 from src.api.stock_prices_loader import StockPricesAPI
-from src.api.rating_loader import RatingAPI
+from src.api.rating_loader import RatingAPI, RATINGS_FILE_PATH
+from src.api.ticker_resolution import TickerResolver
+from src.instrumentation import instrumented
 
 logger = logging.getLogger(__name__)
 
 
-def filter_ratings_without_stock_prices(ratings, stock_prices, horizon) -> pd.DataFrame:
-    # remove ratings at which time no stock prices could be found
-    earliest_known_price = {
-        ticker: stock_prices[ticker]['Date'].min()
-        for ticker in stock_prices
+@instrumented()
+def filter_ratings_without_stock_prices(
+        ratings: pd.DataFrame,
+        stock_prices: PricePanel,
+        horizon: int
+) -> tuple[pd.DataFrame, dict[str, int]]:
+    # Remove ratings for which the performance can not be computed, and count the removed ratings per reason
+    columns = stock_prices.column_of(ratings['Ticker'])
+    rating_dates = ratings['Date_datetime'].to_numpy(dtype='datetime64[ns]')
+
+    # remove ratings of tickers without any stock prices
+    has_prices = (columns >= 0) & (stock_prices.first_valid[columns] >= 0)
+    columns = np.where(has_prices, columns, 0)
+
+    # remove ratings at which time no stock prices could be found (a price before the rating day is needed)
+    earliest_known_price = stock_prices.first_dates.to_numpy(dtype='datetime64[ns]')[columns]
+    is_after_first_price = has_prices & (rating_dates > earliest_known_price)
+
+    # remove ratings for which the not sufficient future stock prices are known (in trading days of the ticker)
+    latest_known_price = stock_prices.last_dates.to_numpy(dtype='datetime64[ns]')[columns]
+    start_days = stock_prices.trading_day_of(stock_prices.row_before(rating_dates), columns)
+    has_future_prices = (
+        (rating_dates + np.timedelta64(int(horizon * 1.3 * 24), 'h') <= latest_known_price)
+        & (start_days + horizon < stock_prices.num_trading_days[columns])
+    )
+
+    dropped = {
+        'no_stock_prices': int((~has_prices).sum()),
+        'before_first_price': int((has_prices & ~is_after_first_price).sum()),
+        'missing_future_prices': int((is_after_first_price & ~has_future_prices).sum()),
     }
-    filtered_ratings = ratings.copy()[
-        ratings.apply(
-            lambda row: row['Date_datetime'] >= earliest_known_price.get(row['Ticker']), axis=1
-        )
-    ]
-
-    # remove ratings for which the not sufficient future stock prices are known
-    latest_known_price = {
-        ticker: stock_prices[ticker]['Date'].max()
-        for ticker in stock_prices
-    }
-    filtered_ratings = filtered_ratings[
-        ratings.apply(
-            lambda row: row['Date_datetime'] + timedelta(days=horizon*1.3) <= latest_known_price.get(row['Ticker']), axis=1
-        )
-    ]
+    filtered_ratings = ratings[is_after_first_price & has_future_prices].copy()
     logger.info(f'Removed {len(ratings) - len(filtered_ratings)} '
-                f'ratings because stock prices are missing for the same time horizon.')
+                f'ratings because stock prices are missing for the same time horizon: {dropped}')
 
-    return filtered_ratings
+    return filtered_ratings, dropped
 
 
+@instrumented()
 def load_historic_ratings_and_prices(
         from_year: int,
         to_year: int,
         performance_horizon: int,
-        load_from_cache: bool = False
+        load_from_cache: bool = False,
+        price_store: Optional[PriceStore] = None,
+        price_provider: Optional[PriceProvider] = None,
+        indices: Optional[list[str]] = None
 ):
-    if load_from_cache and os.path.exists(os.path.join('data', 'cache')):
-        logger.info('Loading cleaned ratings and stock prices from cache')
-        with open(os.path.join('data', 'cache'), 'rb') as file:
-            ratings, stock_prices = pickle.load(file)
+    ratings_from = datetime(year=from_year, month=1, day=1)
+    ratings_to = datetime(year=to_year, month=1, day=1)
+    prices_from = ratings_from - timedelta(days=30)
+    # cached prices need to cover the performance horizon after the last rating (see
+    # `filter_ratings_without_stock_prices`), or need to be downloaded within the last day if that is not over yet
+    prices_to = min(
+        ratings_to + timedelta(hours=int(performance_horizon * 1.3 * 24)),
+        datetime.now() - timedelta(days=1)
+    )
+    price_provider = price_provider or YFinanceProvider()
+
+    # cleaned ratings depend on the selected years, the horizon, the raw rating file and the prices they
+    # are filtered with
+    ratings_key = cache.cache_key(
+        from_year=from_year,
+        to_year=to_year,
+        performance_horizon=performance_horizon,
+        source=cache.file_fingerprint(RATINGS_FILE_PATH),
+        indices=indices,
+        price_provider=price_provider.identity,
+        prices_to=prices_to.date(),
+    )
+    ratings = cache.load_ratings(ratings_key) if load_from_cache else None
+    stock_prices = None
+
+    if ratings is not None:
+        logger.info('Loading cleaned ratings from cache')
+        stock_prices = cache.find_price_panel(
+            list(ratings['Ticker'].unique()), prices_from, prices_to, price_provider.identity
+        )
 
-    else:
+    if stock_prices is None:
         logger.info('Computing cleaned ratings and stock prices')
-        ratings_from = datetime(year=from_year, month=1, day=1)
-        ratings_to = datetime(year=to_year, month=1, day=1)
-
         ratings = RatingAPI(
             from_time=ratings_from,
-            to_time=ratings_to
+            to_time=ratings_to,
+            indices=indices
         ).ratings
 
         # Load historic stock prices for each company with a rating
         companies = list(ratings['Ticker'].unique())
-        prices_from = ratings_from - timedelta(days=30)
-
-        stock_prices = StockPricesAPI(tickers=companies, start_date=prices_from).stock_prices
-
-        ratings = filter_ratings_without_stock_prices(ratings, stock_prices, performance_horizon)
-
-        with open(os.path.join('data', 'cache'), 'wb') as file:
-            pickle.dump((ratings, stock_prices), file)
+        stock_prices = cache.find_price_panel(
+            companies, prices_from, prices_to, price_provider.identity
+        ) if load_from_cache else None
+        if stock_prices is None:
+            # tickers without prices at the provider are remembered per provider and skipped in the next runs
+            negative_cache_path = os.path.join(
+                cache.CACHE_DIR, f'dead_tickers_{cache.cache_key(**price_provider.identity)}.json'
+            )
+            stock_prices = StockPricesAPI(
+                tickers=companies,
+                start_date=prices_from,
+                price_store=price_store,
+                price_provider=price_provider,
+                ticker_resolver=TickerResolver(negative_cache_path=negative_cache_path)
+            ).stock_prices
+            cache.save_price_panel(stock_prices, prices_from, price_provider.identity)
+
+        ratings, _ = filter_ratings_without_stock_prices(ratings, stock_prices, performance_horizon)
+        cache.save_ratings(ratings_key, ratings)
 
     logger.info(f"Loaded {len(ratings)} ratings for which the performance can be computed.")
 
@@ -0,0 +1,150 @@
+from datetime import datetime
+import functools
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.api.ticker_resolution import normalize_symbols
+
+# Constituent lists in `src.rating_collecting.index_lists` per index with the date they were taken
+# (None if unknown, the list is then taken as valid at all times)
+INDEX_SNAPSHOTS = {
+    'SP500': [(datetime(2012, 12, 31), 'SP_500_2013'), (datetime(2019, 1, 1), 'SP_500_TICKER')],
+    'DOW30': [(None, 'DOW_30_TICKER')],
+    'NASDAQ100': [(datetime(2019, 1, 1), 'NAS_100_TICKER')],
+    'HSI': [(datetime(2019, 1, 1), 'HSI_50_TICKER')],
+    'SSE50': [(datetime(2019, 1, 1), 'SSE_50_TICKER')],
+    'CSI300': [(datetime(2019, 1, 1), 'CSI_300_TICKER')],
+    'CAC40': [(datetime(2019, 1, 1), 'CAC_40_TICKER')],
+    'DAX': [(datetime(2021, 2, 1), 'DAX_30_TICKER')],
+    'TECDAX': [(datetime(2021, 2, 1), 'TECDAX_TICKER')],
+    'MDAX': [(datetime(2021, 2, 1), 'MDAX_50_TICKER')],
+    'SDAX': [(datetime(2021, 2, 1), 'SDAX_50_TICKER')],
+    'LQ45': [(datetime(2021, 10, 1), 'LQ45_TICKER')],
+    'SRI_KEHATI': [(None, 'SRI_KEHATI_TICKER')],
+}
+
+# Interval bounds are stored as days since 1970 shifted to 32 bits, so that each interval of a ticker can be
+# searched by the key `ticker code * 2 ** 32 + day`. Unbounded intervals start at 0 and end at 2 ** 32 - 1
+_DAY_SHIFT = 2 ** 31
+_UNBOUNDED_START, _UNBOUNDED_END = 0, 2 ** 32 - 1
+
+
+def _to_days(dates: Iterable, unbounded: int) -> np.ndarray:
+    dates = pd.DatetimeIndex(dates)
+    days = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64) + _DAY_SHIFT
+
+    return np.where(dates.isna(), unbounded, days)
+
+
+class IndexMembership:
+    # Point-in-time constituents of stock indices. `intervals` has one row per membership with the columns
+    # `Index`, `Ticker`, `From` and `To` (exclusive, NaT for memberships without known start or end).
+    # Per index, the intervals are kept in arrays sorted by ticker and start, so that a query is a hash lookup
+    # of the ticker and a binary search of the date.
+    def __init__(self, intervals: pd.DataFrame):
+        self._tables = dict()
+        merged_intervals = []
+
+        for index, index_intervals in intervals.groupby('Index', sort=True):
+            tickers = pd.Index(index_intervals['Ticker'].unique()).sort_values()
+            codes = tickers.get_indexer(index_intervals['Ticker']).astype(np.int64)
+            starts = _to_days(index_intervals['From'], _UNBOUNDED_START)
+            ends = _to_days(index_intervals['To'], _UNBOUNDED_END)
+
+            # merge overlapping or adjacent intervals of the same ticker
+            order = np.lexsort((starts, codes))
+            codes, starts, ends = codes[order], starts[order], ends[order]
+            running_ends = pd.Series(ends).groupby(codes).cummax().to_numpy()
+            is_new = np.ones(len(codes), dtype=bool)
+            is_new[1:] = (codes[1:] != codes[:-1]) | (starts[1:] > running_ends[:-1])
+            codes, starts = codes[is_new], starts[is_new]
+            ends = np.maximum.reduceat(ends, np.flatnonzero(is_new))
+
+            self._tables[index] = (tickers, codes * 2 ** 32 + starts, codes * 2 ** 32 + ends)
+            merged_intervals.append(pd.DataFrame({
+                'Index': index,
+                'Ticker': tickers[codes],
+                'From': self._to_dates(starts, _UNBOUNDED_START),
+                'To': self._to_dates(ends, _UNBOUNDED_END),
+            }))
+
+        self.intervals = pd.concat(merged_intervals, ignore_index=True) if merged_intervals else intervals.iloc[:0]
+
+    @staticmethod
+    def _to_dates(days: np.ndarray, unbounded: int) -> np.ndarray:
+        dates = (days - _DAY_SHIFT).astype('datetime64[D]').astype('datetime64[ns]')
+        dates[days == unbounded] = np.datetime64('NaT')
+
+        return dates
+
+    @classmethod
+    def from_snapshots(cls, snapshots: dict[str, list[tuple[Optional[datetime], list[str]]]]) -> 'IndexMembership':
+        # Memberships from constituent lists taken at known dates: each list is valid from its date until the
+        # date of the next list, the first list also before and the last list also after its date
+        intervals = []
+
+        for index, index_snapshots in snapshots.items():
+            index_snapshots = sorted(index_snapshots, key=lambda snapshot: snapshot[0] or datetime.min)
+            assert len(index_snapshots) == 1 or all(date is not None for date, _ in index_snapshots), \
+                f'All constituent lists of {index} need a date'
+
+            for i, (_, tickers) in enumerate(index_snapshots):
+                intervals.append(pd.DataFrame({
+                    'Index': index,
+                    'Ticker': list(tickers),
+                    'From': index_snapshots[i][0] if i > 0 else pd.NaT,
+                    'To': index_snapshots[i + 1][0] if i + 1 < len(index_snapshots) else pd.NaT,
+                }))
+
+        return cls(pd.concat(intervals, ignore_index=True))
+
+    @property
+    def indices(self) -> list[str]:
+        return list(self._tables.keys())
+
+    def mask(self, index: str, tickers: Iterable[str], dates: Iterable) -> np.ndarray:
+        # whether each ticker was a constituent of the index at the respective date
+        assert index in self._tables, f'Unknown index {index}'
+        index_tickers, start_keys, end_keys = self._tables[index]
+
+        codes = index_tickers.get_indexer(tickers).astype(np.int64)
+        days = _to_days(dates, -1)
+        keys = codes * 2 ** 32 + days
+
+        # last interval starting at or before the date, which belongs to the same ticker if the date is before its end
+        positions = np.searchsorted(start_keys, keys, side='right') - 1
+        is_valid = (codes >= 0) & (days >= 0) & (positions >= 0)
+
+        return is_valid & (keys < end_keys[np.maximum(positions, 0)])
+
+    def mask_any(self, indices: Iterable[str], tickers: Iterable[str], dates: Iterable) -> np.ndarray:
+        # whether each ticker was a constituent of any of the indices at the respective date
+        tickers, dates = pd.Index(tickers), pd.DatetimeIndex(dates)
+        is_member = np.zeros(len(tickers), dtype=bool)
+        for index in indices:
+            is_member |= self.mask(index, tickers, dates)
+
+        return is_member
+
+    def is_member(self, index: str, ticker: str, date: datetime) -> bool:
+        return bool(self.mask(index, [ticker], [date])[0])
+
+    def members(self, index: str, date: datetime) -> list[str]:
+        index_tickers = self._tables[index][0]
+        is_member = self.mask(index, index_tickers, [date] * len(index_tickers))
+
+        return index_tickers[is_member].tolist()
+
+
+@functools.lru_cache(maxsize=1)
+def load_index_membership() -> IndexMembership:
+    # memberships of all indices with constituent lists in `src.rating_collecting.index_lists`,
+    # with the symbols in the conventions of the price provider
+    from src.rating_collecting import index_lists
+
+    return IndexMembership.from_snapshots({
+        index: [(date, normalize_symbols(index_lists.get_constituents(list_name))) for date, list_name in snapshots]
+        for index, snapshots in INDEX_SNAPSHOTS.items()
+    })
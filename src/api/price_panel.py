@@ -0,0 +1,190 @@
+import functools
+import hashlib
+import json
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class PricePanel:
+    # Closing prices of all tickers in one contiguous (n_dates x n_tickers) float64 array on a dense
+    # trading-date axis. Prices missing between the first and last known price of a ticker are filled
+    # with the last known close, prices outside of that range are NaN. `is_observed` marks the prices
+    # which were actually known. Horizons are counted in trading days of each ticker, i.e. in its observed
+    # prices, see `trading_day_of` and `row_of_trading_day`.
+    def __init__(self, dates: Iterable, tickers: Iterable[str], closes: np.ndarray):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        assert closes.shape == (len(self.dates), len(self.tickers)), 'Prices do not match dates and tickers'
+        assert self.dates.is_monotonic_increasing, 'Dates of the price panel must be sorted'
+
+        self.is_observed = ~np.isnan(closes)
+        has_prices = self.is_observed.any(axis=0)
+        if len(self.dates) > 0:
+            self.first_valid = np.where(has_prices, self.is_observed.argmax(axis=0), -1)
+            self.last_valid = np.where(has_prices, len(self.dates) - 1 - self.is_observed[::-1].argmax(axis=0), -1)
+        else:  # no prices at all, e.g. if none could be downloaded
+            self.first_valid = np.full(len(self.tickers), -1)
+            self.last_valid = np.full(len(self.tickers), -1)
+
+        self.closes = np.array(pd.DataFrame(closes).ffill(), dtype=np.float64, order='C')
+        self.closes[np.arange(len(self.dates))[:, np.newaxis] > self.last_valid] = np.nan
+        self._fingerprint = None
+
+    @classmethod
+    def from_frames(cls, frames: dict[str, pd.DataFrame], value_col: str = 'Close') -> 'PricePanel':
+        # build the panel from per-ticker frames with a `Date` column or a date index
+        closes = pd.DataFrame({
+            ticker: frame.set_index('Date')[value_col] if 'Date' in frame.columns else frame[value_col]
+            for ticker, frame in frames.items()
+        }).sort_index()
+
+        return cls(closes.index, closes.columns, closes.to_numpy(dtype=np.float64))
+
+    @classmethod
+    def from_arrays(
+            cls,
+            dates: Iterable,
+            tickers: Iterable[str],
+            closes: np.ndarray,
+            first_valid: np.ndarray,
+            last_valid: np.ndarray,
+            is_observed: Optional[np.ndarray] = None,
+            fingerprint: Optional[str] = None
+    ) -> 'PricePanel':
+        # restore an already cleaned panel (e.g. memory-mapped from the cache) without copying the prices
+        panel = cls.__new__(cls)
+        panel.dates = pd.DatetimeIndex(dates)
+        panel.tickers = pd.Index(tickers)
+        panel.closes = closes
+        panel.first_valid = np.asarray(first_valid)
+        panel.last_valid = np.asarray(last_valid)
+        # without an explicit mask, all prices in the range of known prices are taken as observed
+        panel.is_observed = is_observed if is_observed is not None else ~np.isnan(closes)
+        panel._fingerprint = fingerprint
+
+        return panel
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.tickers
+
+    @property
+    def nbytes(self) -> int:
+        return self.closes.nbytes
+
+    @property
+    def fingerprint(self) -> str:
+        # Hash of the prices, which keys data derived from them. Subsets keep the fingerprint of the panel
+        # they were taken from, as the prices of each ticker and date are the same
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            digest.update(json.dumps(list(self.tickers), default=str).encode('utf-8'))
+            digest.update(self.dates.to_numpy(dtype='datetime64[ns]').tobytes())
+            digest.update(np.ascontiguousarray(self.closes).tobytes())
+            digest.update(np.ascontiguousarray(self.is_observed).tobytes())
+            self._fingerprint = digest.hexdigest()[:16]
+
+        return self._fingerprint
+
+    @property
+    def first_dates(self) -> pd.Series:
+        # date of the first known price per ticker (NaT for tickers without any price)
+        return self._dates_at(self.first_valid)
+
+    @property
+    def last_dates(self) -> pd.Series:
+        # date of the last known price per ticker (NaT for tickers without any price)
+        return self._dates_at(self.last_valid)
+
+    def _dates_at(self, rows: np.ndarray) -> pd.Series:
+        dates = np.full(len(rows), np.datetime64('NaT'), dtype='datetime64[ns]')
+        dates[rows >= 0] = self.dates[rows[rows >= 0]].to_numpy()
+
+        return pd.Series(dates, index=self.tickers)
+
+    def column_of(self, tickers: Iterable[str]) -> np.ndarray:
+        # column index of each ticker in the panel, -1 for unknown tickers
+        return self.tickers.get_indexer(tickers)
+
+    def row_before(self, dates: Iterable) -> np.ndarray:
+        # index of the last trading date strictly before each of the given dates
+        return np.searchsorted(self.dates.to_numpy(), np.asarray(dates, dtype='datetime64[ns]'), side='left') - 1
+
+    @functools.cached_property
+    def _observed_counts(self) -> np.ndarray:
+        # number of observed prices of each ticker up to and including each row
+        return np.cumsum(self.is_observed, axis=0, dtype=np.int32)
+
+    @functools.cached_property
+    def _observed_rows(self) -> tuple[np.ndarray, np.ndarray]:
+        # rows of the observed prices of all tickers one after another, and the offset of each ticker
+        columns, rows = np.nonzero(np.asarray(self.is_observed).T)
+        offsets = np.zeros(len(self.tickers), dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(columns, minlength=len(self.tickers)))[:-1]
+
+        return rows, offsets
+
+    @property
+    def num_trading_days(self) -> np.ndarray:
+        # number of observed prices per ticker
+        if len(self.dates) == 0:
+            return np.zeros(len(self.tickers), dtype=np.int32)
+
+        return self._observed_counts[-1]
+
+    def trading_day_of(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        # index of the last observed price at or before each row among the observed prices of the ticker,
+        # -1 before the first observed price
+        return self._observed_counts[rows, columns] - 1
+
+    def row_of_trading_day(self, trading_days: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        # row of the observed price with the given index among the observed prices of the ticker
+        rows, offsets = self._observed_rows
+
+        return rows[offsets[columns] + trading_days]
+
+    def subset(self, tickers: Iterable[str], start_date) -> 'PricePanel':
+        # restrict the panel to the given tickers and to the dates from `start_date` on
+        columns = self.column_of(tickers)
+        assert (columns >= 0).all(), 'Cannot select tickers which are not part of the price panel'
+        first_row = int(np.searchsorted(self.dates.to_numpy(), np.datetime64(start_date, 'ns'), side='left'))
+
+        if np.array_equal(columns, np.arange(len(self.tickers))):
+            closes = self.closes[first_row:]  # view, e.g. into the memory-mapped cache
+            is_observed = self.is_observed[first_row:]
+        else:
+            closes = self.closes[first_row:, columns]
+            is_observed = self.is_observed[first_row:, columns]
+
+        has_prices = self.last_valid[columns] >= first_row
+
+        # the first row holds the last price known before `start_date` of tickers starting earlier,
+        # which is taken as observed, so that the trading days of each ticker still start at its first price
+        starts_earlier = has_prices & (self.first_valid[columns] < first_row)
+        if starts_earlier.any() and not is_observed[0, starts_earlier].all():
+            is_observed = np.array(is_observed)
+            is_observed[0, starts_earlier] = True
+
+        return PricePanel.from_arrays(
+            dates=self.dates[first_row:],
+            tickers=self.tickers[columns],
+            closes=closes,
+            first_valid=np.where(has_prices, np.maximum(self.first_valid[columns] - first_row, 0), -1),
+            last_valid=np.where(has_prices, self.last_valid[columns] - first_row, -1),
+            is_observed=is_observed,
+            fingerprint=self.fingerprint,
+        )
+
+    def get_prices(self, ticker: str) -> pd.DataFrame:
+        # known prices of a single ticker as a frame with columns `Date` and `Close`
+        column = self.tickers.get_loc(ticker)
+        rows = slice(self.first_valid[column], self.last_valid[column] + 1)
+
+        return pd.DataFrame({
+            'Date': self.dates[rows],
+            'Close': self.closes[rows, column],
+        })
@@ -0,0 +1,228 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import os
+import time
+from typing import Callable, Optional
+import zlib
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# reason recorded in the `failures` of a provider for tickers which the provider has no prices for,
+# other reasons are errors of the download, e.g. rate limits
+NO_PRICES = 'no prices'
+
+
+class PriceProvider(ABC):
+    # Source of daily stock prices used by `StockPricesAPI`. Providers can record why no prices were
+    # downloaded for a ticker in a `failures` dict, tickers missing without a recorded reason have no prices
+
+    @abstractmethod
+    def download(self, tickers: list[str], start_date: datetime) -> dict[str, pd.DataFrame]:
+        # Return the prices from `start_date` on for each ticker, for which prices are available,
+        # as a frame with a `Date` index and at least a `Close` column
+        pass
+
+    @property
+    def identity(self) -> dict:
+        # the parameters which determine the downloaded prices, part of the keys of cached prices and
+        # of data derived from them, so that prices of different sources never replace each other
+        return {'provider': type(self).__name__}
+
+
+class YFinanceProvider(PriceProvider):
+    # Downloads the tickers from Yahoo Finance in batches of `batch_size`, each with up to `max_workers`
+    # parallel requests. Tickers of a batch without prices are retried with exponential backoff, tickers
+    # still failing after the last attempt are skipped and recorded in `failures` with the reason: `NO_PRICES`
+    # if all attempts succeeded without prices for the ticker, otherwise the last error of the batch.
+    # `download_fn` replaces `yfinance.download`, e.g. by a stand-in serving local data in tests.
+    def __init__(
+            self,
+            batch_size: int = 100,
+            max_workers: int = 8,
+            max_retries: int = 2,
+            backoff_seconds: float = 1.0,
+            download_fn: Optional[Callable[..., pd.DataFrame]] = None
+    ):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.download_fn = download_fn
+        self.failures = dict()
+
+    @property
+    def identity(self) -> dict:
+        download_fn = None if self.download_fn is None else getattr(
+            self.download_fn, '__qualname__', type(self.download_fn).__name__
+        )
+        return {**super().identity, 'download_fn': download_fn}
+
+    @staticmethod
+    def _split_by_ticker(all_tickers: pd.DataFrame, tickers: list[str]) -> dict[str, pd.DataFrame]:
+        # Prices of each ticker with any close are selected from the (ticker, field) columns without copying.
+        # Unknown or delisted tickers are missing or only have NaN prices
+        if all_tickers is None or all_tickers.empty:
+            return dict()
+        if not isinstance(all_tickers.columns, pd.MultiIndex):
+            all_tickers = pd.concat({tickers[0]: all_tickers}, axis=1)
+
+        closes = all_tickers.xs('Close', axis=1, level=1)
+        with_prices = set(closes.columns[closes.notna().any(axis=0)])
+
+        return {
+            ticker: all_tickers[ticker]
+            for ticker in tickers
+            if ticker in with_prices
+        }
+
+    def _download_batch(self, tickers: list[str], start_date: datetime) -> dict[str, pd.DataFrame]:
+        download_fn = self.download_fn
+        if download_fn is None:
+            import yfinance as yf
+            download_fn = yf.download
+
+        ticker_dict = dict()
+        remaining = list(tickers)
+        error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+
+            try:
+                all_tickers = download_fn(
+                    tickers=remaining,
+                    start=start_date,
+                    group_by='ticker',
+                    threads=self.max_workers,
+                    progress=False,
+                )
+                ticker_dict.update(self._split_by_ticker(all_tickers, remaining))
+                reason = NO_PRICES
+            except Exception as e:
+                reason = error = f'{type(e).__name__}: {e}'
+
+            remaining = [ticker for ticker in remaining if ticker not in ticker_dict]
+            if len(remaining) == 0:
+                break
+            logger.info(f'Attempt {attempt + 1} failed for {len(remaining)} of {len(tickers)} tickers ({reason}).')
+
+        # tickers of a batch with errors may have prices, which could not be downloaded
+        self.failures.update({ticker: error or NO_PRICES for ticker in remaining})
+
+        return ticker_dict
+
+    def download(self, tickers: list[str], start_date: datetime) -> dict[str, pd.DataFrame]:
+        # yfinance keeps the results of a download in module-level state, so batches are downloaded one
+        # after another and the parallelism is bounded by the threads of each download
+        self.failures = dict()
+        ticker_dict = dict()
+
+        for batch_start in range(0, len(tickers), self.batch_size):
+            batch = tickers[batch_start:batch_start + self.batch_size]
+            ticker_dict.update(self._download_batch(batch, start_date))
+            logger.info(f'Downloaded prices of {len(ticker_dict)} of {min(batch_start + len(batch), len(tickers))} '
+                        f'tickers.')
+
+        if len(self.failures) > 0:
+            logger.info(f'No prices downloaded for {len(self.failures)} tickers: {list(self.failures)}')
+
+        return ticker_dict
+
+
+class LocalFileProvider(PriceProvider):
+    # Reads bulk price files from a directory with one `<ticker>.parquet` or `<ticker>.csv` file per ticker.
+    # CSV files need a `Date` and a `Close` column. Files are read in parallel.
+    def __init__(self, directory: str, max_workers: int = 8):
+        self.directory = directory
+        self.max_workers = max_workers
+
+    @property
+    def identity(self) -> dict:
+        return {**super().identity, 'directory': os.path.abspath(self.directory)}
+
+    def _read_ticker(self, ticker: str, start_date: datetime) -> Optional[pd.DataFrame]:
+        parquet_path = os.path.join(self.directory, f'{ticker}.parquet')
+        csv_path = os.path.join(self.directory, f'{ticker}.csv')
+
+        if os.path.exists(parquet_path):
+            prices = pd.read_parquet(parquet_path)
+            if 'Date' in prices.columns:
+                prices = prices.set_index('Date')
+        elif os.path.exists(csv_path):
+            prices = pd.read_csv(csv_path, index_col='Date', parse_dates=['Date'])
+        else:
+            return None
+
+        prices.index = pd.to_datetime(prices.index)
+
+        return prices.sort_index().loc[lambda df: df.index >= start_date]
+
+    def download(self, tickers: list[str], start_date: datetime) -> dict[str, pd.DataFrame]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            all_prices = executor.map(lambda ticker: self._read_ticker(ticker, start_date), tickers)
+            ticker_dict = {
+                ticker: prices
+                for ticker, prices in zip(tickers, all_prices)
+                if prices is not None
+            }
+
+        if len(ticker_dict) < len(tickers):
+            logger.info(f'No price files found for {len(tickers) - len(ticker_dict)} tickers in {self.directory}.')
+
+        return ticker_dict
+
+
+class SyntheticPriceProvider(PriceProvider):
+    # Deterministic random walks (geometric Brownian motion on business days) for offline runs and benchmarks.
+    # The series of each ticker only depends on the seed and the ticker, so that different start dates
+    # and repeated downloads of the same ticker yield consistent prices.
+    def __init__(
+            self,
+            seed: int = 0,
+            end_date: Optional[datetime] = None,
+            annual_drift: float = 0.07,
+            annual_volatility: float = 0.25,
+            origin_date: datetime = datetime(2000, 1, 3)
+    ):
+        self.seed = seed
+        # prices until today by default, without the time of day so that the identity is stable within a day
+        self.end_date = end_date or datetime.combine(datetime.now().date(), datetime.min.time())
+        self.annual_drift = annual_drift
+        self.annual_volatility = annual_volatility
+        self.origin_date = origin_date
+        self._dates = pd.bdate_range(self.origin_date, self.end_date, name='Date')
+
+    @property
+    def identity(self) -> dict:
+        return {
+            **super().identity,
+            'seed': self.seed,
+            'annual_drift': self.annual_drift,
+            'annual_volatility': self.annual_volatility,
+            'origin_date': self.origin_date,
+            'end_date': self.end_date,
+        }
+
+    def _simulate(self, ticker: str) -> np.ndarray:
+        generator = np.random.default_rng([self.seed, zlib.crc32(ticker.encode('utf-8'))])
+        daily_volatility = self.annual_volatility / np.sqrt(252)
+        daily_drift = self.annual_drift / 252 - daily_volatility ** 2 / 2
+        # the price level is drawn before the returns, so that it does not depend on the number of dates
+        price_level = generator.uniform(10, 500)
+        log_returns = generator.normal(daily_drift, daily_volatility, size=len(self._dates))
+
+        return price_level * np.exp(np.cumsum(log_returns))
+
+    def download(self, tickers: list[str], start_date: datetime) -> dict[str, pd.DataFrame]:
+        first_row = self._dates.searchsorted(start_date)
+
+        return {
+            ticker: pd.DataFrame({'Close': self._simulate(ticker)[first_row:]}, index=self._dates[first_row:])
+            for ticker in tickers
+        }
@@ -0,0 +1,108 @@
+from datetime import datetime
+import json
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRICE_STORE_DIR = os.path.join('data', 'prices')
+
+# relative tolerance for re-downloaded bars to match the stored ones
+ADJUSTMENT_TOLERANCE = 1e-5
+
+
+class PriceStore:
+    # Persistent local store of downloaded daily prices with one Parquet file per ticker.
+    # For each ticker, the index file records the first requested date and the date of the last
+    # stored bar (high-water mark), so that a refresh only needs to download the dates after it.
+    def __init__(self, directory: str = PRICE_STORE_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._index_path = os.path.join(self.directory, 'index.json')
+        self._index = self._load_index()
+
+    def _load_index(self) -> dict[str, dict[str, str]]:
+        if not os.path.exists(self._index_path):
+            return dict()
+
+        with open(self._index_path) as file:
+            return json.load(file)
+
+    def _save_index(self) -> None:
+        # write to a temporary file first so that a crash never leaves a corrupt index behind
+        temporary_path = f'{self._index_path}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(self._index, file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self._index_path)
+
+    def _ticker_path(self, ticker: str) -> str:
+        return os.path.join(self.directory, f'{ticker}.parquet')
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._index
+
+    def start_date(self, ticker: str) -> Optional[datetime]:
+        # first date for which prices of the ticker were requested
+        if ticker not in self._index:
+            return None
+
+        return datetime.fromisoformat(self._index[ticker]['start'])
+
+    def high_water_mark(self, ticker: str) -> Optional[datetime]:
+        # date of the last stored bar of the ticker
+        if ticker not in self._index or self._index[ticker]['end'] is None:
+            return None
+
+        return datetime.fromisoformat(self._index[ticker]['end'])
+
+    def load(self, ticker: str) -> pd.DataFrame:
+        if not os.path.exists(self._ticker_path(ticker)):
+            return pd.DataFrame(columns=['Close'], index=pd.DatetimeIndex([], name='Date'), dtype='float64')
+
+        return pd.read_parquet(self._ticker_path(ticker))
+
+    def replace(self, ticker: str, prices: pd.DataFrame, start_date: datetime) -> None:
+        # store the full history of a ticker, e.g. after it was downloaded for the first time
+        self._write(ticker, prices, start_date)
+
+    def matches_stored(self, ticker: str, prices: pd.DataFrame) -> bool:
+        # Whether re-downloaded bars agree with the stored bars of the same dates. Closes adjusted for splits
+        # and dividends change retroactively, so a mismatch means that the stored history has another
+        # adjustment basis and needs to be downloaded again
+        stored = self.load(ticker)['Close']
+        overlap = stored.index.intersection(prices.index)
+
+        return bool(np.allclose(
+            prices.loc[overlap, 'Close'].to_numpy(dtype=np.float64),
+            stored.loc[overlap].to_numpy(dtype=np.float64),
+            rtol=ADJUSTMENT_TOLERANCE,
+            atol=0,
+        ))
+
+    def append(self, ticker: str, prices: pd.DataFrame) -> pd.DataFrame:
+        # Merge newly downloaded bars into the stored history. Returns the appended bars preceded by
+        # the last previously stored bar, so that the new segment can be validated in context
+        stored = self.load(ticker)
+        high_water_mark = self.high_water_mark(ticker)
+        appended = prices if high_water_mark is None else prices[prices.index > high_water_mark]
+
+        if len(appended) > 0:
+            self._write(ticker, pd.concat([stored, appended]), self.start_date(ticker))
+
+        return pd.concat([stored.tail(1), appended]) if len(appended) > 0 else appended
+
+    def _write(self, ticker: str, prices: pd.DataFrame, start_date: datetime) -> None:
+        prices = prices[~prices.index.duplicated(keep='last')].sort_index()
+        prices.index.name = 'Date'
+        prices.to_parquet(self._ticker_path(ticker))
+
+        self._index[ticker] = {
+            'start': start_date.isoformat(),
+            'end': prices.index.max().isoformat() if len(prices) > 0 else None,
+        }
+        self._save_index()
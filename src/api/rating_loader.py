@@ -1,81 +1,238 @@
 
 from datetime import datetime
+import logging
 import os.path
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 
+from src.instrumentation import instrumented
+from . import cache
+from .index_membership import IndexMembership, load_index_membership
 from .rating_mapping import rating_mapping
+from .ticker_resolution import TickerResolver, normalize_symbols
+
+logger = logging.getLogger(__name__)
+
+RATINGS_FILE_PATH = os.path.join('data', 'ratings_SP500_2013.csv')
+RATINGS_DATE_FORMAT = '%m/%d/%Y'
+
+# 'Rater: Rating' or 'Rater: From rating to Rating'
+_RATING_TEXT_PATTERN = r'^(?P<Rater>[^:]*?)\s*:\s*(?:(?P<From>[^:]*?)\s+to\s+)?(?P<To>[^:]*?)\s*(?::|$)'
+
+_rating_to_value = {
+    'Sell': 0,
+    'Hold': 1,
+    'Buy': 2
+}
+
+
+def rolling_rating_statistics(
+        ratings: pd.DataFrame,
+        window: str = '90D',
+        value_col: str = 'Rating_numeric',
+        include_sum_std: bool = False
+) -> pd.DataFrame:
+    # Time-based rolling mean and count (and optionally sum and std) of the ratings per ticker within
+    # the trailing `window`, including the current rating, computed in one pass over all tickers.
+    # Ratings have to be sorted by 'Ticker' and 'Date_datetime'.
+    times = ratings['Date_datetime'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    values = ratings[value_col].to_numpy(dtype=np.float64)
+    is_valid = ~np.isnan(values)
+    values = np.where(is_valid, values, 0.0)
+
+    # For each rating, find the first rating of the same ticker within the window by one binary search over
+    # the keys `ticker code * span + time rank`, which are sorted as the ratings are. Times are replaced by
+    # their rank among all distinct times, so that the keys can not overflow
+    tickers = ratings['Ticker'].to_numpy()
+    ticker_codes = np.zeros(len(ratings), dtype=np.int64)
+    ticker_codes[1:] = np.cumsum(tickers[1:] != tickers[:-1])
+    distinct_times, time_ranks = np.unique(times, return_inverse=True)
+    span = len(distinct_times) + 1
+
+    # the first rank within the window is the number of distinct times at or before the start of the window
+    window_start_ranks = np.searchsorted(distinct_times, times - pd.Timedelta(window).value, side='right')
+    window_start = np.searchsorted(
+        ticker_codes * span + time_ranks, ticker_codes * span + window_start_ranks, side='left'
+    )
+
+    # sums over windows as differences of prefix sums
+    def window_sum(x: np.ndarray) -> np.ndarray:
+        prefix_sum = np.concatenate([[0], np.cumsum(x)])
+        return prefix_sum[1:] - prefix_sum[window_start]
+
+    count = window_sum(is_valid.astype(np.float64))
+    total = window_sum(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        statistics = pd.DataFrame({'mean': total / count, 'count': count}, index=ratings.index)
+
+        if include_sum_std:
+            squared_deviations = np.maximum(window_sum(values ** 2) - total ** 2 / count, 0.0)
+            statistics['sum'] = total
+            statistics['std'] = np.sqrt(squared_deviations / (count - 1))
+            statistics.loc[count < 2, 'std'] = np.nan
+
+    return statistics
 
 
 class RatingAPI:
-    def __init__(self, from_time: datetime, to_time: datetime):
+    def __init__(
+            self,
+            from_time: datetime,
+            to_time: datetime,
+            use_cache: bool = True,
+            rolling_window: str = '90D',
+            tickers: Optional[list[str]] = None,
+            file_path: str = RATINGS_FILE_PATH,
+            chunksize: int = 100_000,
+            indices: Optional[list[str]] = None,
+            index_membership: Optional[IndexMembership] = None,
+            ticker_resolver: Optional[TickerResolver] = None,
+            resolve_tickers: bool = True
+    ):
         self.from_time = from_time
         self.to_time = to_time
+        self.use_cache = use_cache
+        self.rolling_window = rolling_window
+        self.tickers = tickers
+        self.file_path = file_path
+        self.chunksize = chunksize
+        # keep only ratings of tickers, which were a constituent of any of these indices at the rating date
+        self.indices = indices
+        self.index_membership = index_membership
+        # tickers are mapped to the symbols of the price provider, e.g. applying symbol changes
+        self.ticker_resolver = (ticker_resolver or TickerResolver()) if resolve_tickers else None
 
         self._ratings = self._get_cleaned_ratings()
 
     @property
     def ratings(self):
         return self._ratings[
-            ['Ticker', 'Rater', 'Change', 'Rating_text', 'Rating_numeric', 'Date_datetime', 'Rolling_mean', 'Rolling_mean_count']
+            ['Ticker', 'Rater', 'Change', 'Rating_text', 'From_rating_text', 'Rating_numeric', 'Date_datetime',
+             'Rolling_mean', 'Rolling_mean_count']
         ]
 
+    @instrumented()
     def _load_ratings_from_file(self) -> pd.DataFrame:
-        file_path = os.path.join('data', 'ratings_SP500_2013.csv')
-        assert os.path.exists(file_path), 'File with raw ratings could not be found.'
-
-        ratings = pd.read_csv(file_path)
+        assert os.path.exists(self.file_path), 'File with raw ratings could not be found.'
+
+        # Stream the file in chunks and keep only the ratings within the time range (and of the selected
+        # tickers), so that only a small part of a large rating archive is ever held in memory
+        chunks = []
+        num_read, retained_bytes, peak_bytes = 0, 0, 0
+
+        with pd.read_csv(
+                self.file_path,
+                usecols=['Ticker', 'Change', 'Text', 'Date'],
+                dtype={'Ticker': 'string', 'Change': 'category', 'Text': 'string', 'Date': 'string'},
+                chunksize=self.chunksize,
+        ) as reader:
+            for chunk in reader:
+                num_read += len(chunk)
+                chunk_bytes = chunk.memory_usage(deep=True).sum()
+
+                chunk['Date_datetime'] = pd.to_datetime(chunk['Date'], format=RATINGS_DATE_FORMAT, errors='coerce')
+                is_selected = (chunk['Date_datetime'] >= self.from_time) & (chunk['Date_datetime'] <= self.to_time)
+                if self.tickers is not None:
+                    is_selected &= chunk['Ticker'].isin(self.tickers)
+
+                chunk = chunk[is_selected]
+                chunks.append(chunk)
+                retained_bytes += chunk.memory_usage(deep=True).sum()
+                peak_bytes = max(peak_bytes, retained_bytes + chunk_bytes)
+
+        ratings = pd.concat(chunks, ignore_index=True)
+        ratings['Change'] = ratings['Change'].astype('category')  # union of the categories of all chunks
+        logger.info(f'Loaded {len(ratings)} of {num_read} ratings from {self.file_path} '
+                    f'with a peak memory of {peak_bytes / 2 ** 20:.1f} MB.')
 
         return ratings
 
-    def _clean_ratings(self, raw_ratings: pd.DataFrame) -> pd.DataFrame:
+    @instrumented()
+    def _parse_ratings(self, raw_ratings: pd.DataFrame) -> pd.DataFrame:
 
-        if 'Date' not in raw_ratings.columns or 'Text' not in raw_ratings.columns:
-            raise ValueError("Input DataFrame must contain columns 'Date' and 'Text'.")
+        if 'Date_datetime' not in raw_ratings.columns or 'Text' not in raw_ratings.columns:
+            raise ValueError("Input DataFrame must contain columns 'Date_datetime' and 'Text'.")
 
-        _rating_to_value = {
-            'Sell': 0,
-            'Hold': 1,
-            'Buy': 2
-        }
+        # Split 'Text' column into 'Rater', the original rating and the rating before a change
+        parsed_text = raw_ratings['Text'].astype('string').str.extract(_RATING_TEXT_PATTERN)
 
-        cleaned_ratings = (
+        parsed_ratings = (
             raw_ratings
-            # Convert 'Date' to datetime and filter to selected time range
-            .assign(Date_datetime=lambda x: pd.to_datetime(x['Date'], errors='coerce'))
-            .loc[lambda df: (df['Date_datetime'] >= self.from_time) &
-                            (df['Date_datetime'] <= self.to_time)]
-            # Split 'Text' column into 'Rater' and 'Rating'
             .assign(
-                Rater=lambda x: x['Text'].apply(
-                    lambda s: s.split(':')[0].strip() if ':' in s else None
-                ),
-                Original_Rating_text=lambda x: x['Text'].apply(
-                    lambda s: s.split(':')[1].split(' to ')[1].strip() if ' to ' in s else s.split(':')[1].strip()
-                )
+                Rater=parsed_text['Rater'].astype('category'),
+                Original_Rating_text=parsed_text['To'],
+                Original_From_rating_text=parsed_text['From'],
+                Change=lambda x: x['Change'].astype('category'),
             )
             # Map rating text into a numeric value and map each rating to 'SELL', 'HOLD' and 'BUY'
             .assign(
-                Rating_text=lambda x: x['Original_Rating_text'].map(rating_mapping),
-                Rating_numeric=lambda x: x['Rating_text'].map(_rating_to_value)
+                Rating_text=lambda x: x['Original_Rating_text'].map(rating_mapping).astype('category'),
+                From_rating_text=lambda x: x['Original_From_rating_text'].map(rating_mapping).astype('category'),
+                Rating_numeric=lambda x: x['Rating_text'].map(_rating_to_value).astype('float64')
             )
+        )
+
+        return parsed_ratings
+
+    def _get_parsed_ratings(self) -> pd.DataFrame:
+        # parsed ratings are cached per version of the raw rating file and selection of ratings
+        key = cache.cache_key(
+            stage='parsed_ratings',
+            source=cache.file_fingerprint(self.file_path),
+            from_time=self.from_time,
+            to_time=self.to_time,
+            tickers=sorted(self.tickers) if self.tickers is not None else None,
+        )
+        parsed_ratings = cache.load_ratings(key) if self.use_cache else None
+
+        if parsed_ratings is None:
+            parsed_ratings = self._parse_ratings(self._load_ratings_from_file())
+            if self.use_cache:
+                cache.save_ratings(key, parsed_ratings)
+
+        return parsed_ratings
+
+    @instrumented()
+    def _clean_ratings(self, parsed_ratings: pd.DataFrame) -> pd.DataFrame:
+        cleaned_ratings = (
+            parsed_ratings
+            # filter to selected time range
+            .loc[lambda df: (df['Date_datetime'] >= self.from_time) &
+                            (df['Date_datetime'] <= self.to_time)]
             .dropna(subset=['Ticker', 'Rater', 'Rating_text', 'Date_datetime'])
-            .sort_values(by=["Ticker", "Date_datetime"])
         )
 
-        return cleaned_ratings
+        if self.indices is not None:
+            # index memberships refer to the symbols at the rating date, i.e. before any symbol change
+            membership = self.index_membership or load_index_membership()
+            is_constituent = membership.mask_any(
+                self.indices, normalize_symbols(cleaned_ratings['Ticker']), cleaned_ratings['Date_datetime']
+            )
+            logger.info(f'Keeping {is_constituent.sum()} of {len(cleaned_ratings)} ratings of constituents of '
+                        f'{", ".join(self.indices)} at the rating date.')
+            cleaned_ratings = cleaned_ratings[is_constituent]
 
-    def _compute_rolling_mean(self, cleaned_ratings: pd.DataFrame):
-        cleaned_ratings['Rolling_mean'] = cleaned_ratings.groupby("Ticker", group_keys=False).apply(
-            lambda x: x[["Rating_numeric", "Date_datetime"]].rolling("90D", min_periods=1, on='Date_datetime').mean()
-        )["Rating_numeric"]
+        if self.ticker_resolver is not None:
+            resolved_tickers = self.ticker_resolver.resolve(
+                cleaned_ratings['Ticker'], cleaned_ratings['Date_datetime']
+            )
+            cleaned_ratings = cleaned_ratings.assign(
+                Ticker=pd.array(resolved_tickers, dtype=cleaned_ratings['Ticker'].dtype)
+            )
 
-        cleaned_ratings['Rolling_mean_count'] = cleaned_ratings.groupby("Ticker", group_keys=False).apply(
-            lambda x: x[["Rating_numeric", "Date_datetime"]].rolling("90D", min_periods=1, on='Date_datetime').count()
-        )["Rating_numeric"]
+        return cleaned_ratings.sort_values(by=["Ticker", "Date_datetime"])
+
+    @instrumented()
+    def _compute_rolling_mean(self, cleaned_ratings: pd.DataFrame):
+        rolling_statistics = rolling_rating_statistics(cleaned_ratings, window=self.rolling_window)
+        cleaned_ratings['Rolling_mean'] = rolling_statistics['mean']
+        cleaned_ratings['Rolling_mean_count'] = rolling_statistics['count']
 
     def _get_cleaned_ratings(self) -> pd.DataFrame:
-        raw_ratings = self._load_ratings_from_file()
-        cleaned_ratings = self._clean_ratings(raw_ratings)
+        parsed_ratings = self._get_parsed_ratings()
+        cleaned_ratings = self._clean_ratings(parsed_ratings)
         self._compute_rolling_mean(cleaned_ratings)
 
         return cleaned_ratings
@@ -1,84 +1,264 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 import logging
+from typing import Iterable, Optional
 
+import numpy as np
 import pandas as pd
-import yfinance as yf
+
+from src.instrumentation import instrumented
+from .price_panel import PricePanel
+from .price_providers import NO_PRICES, PriceProvider, YFinanceProvider
+from .price_store import PriceStore
+from .ticker_resolution import TickerResolver
 
 logger = logging.getLogger(__name__)
 
+# thresholds of the price validation
+MAX_DAILY_CHANGE = 0.5
+MIN_COMPLETENESS = 0.66
+MAX_STALENESS = timedelta(days=10)
+# stored bars downloaded again when refreshing the price store, to detect changes of the price adjustments
+REFRESH_OVERLAP = timedelta(days=10)
+VALIDATION_FLAGS = ['no_prices', 'large_jump', 'incomplete', 'late_start', 'stale_end']
+
+
+def validate_price_panel(
+        prices: PricePanel,
+        start_date: datetime,
+        check_start: bool = True,
+        now: Optional[datetime] = None
+) -> pd.DataFrame:
+    # Validation report with one row per ticker: metrics of the known prices and a flag per failed check
+    #  - large_jump: the price changes by more than 50% from one known price to the next
+    #  - incomplete: prices are known on less than 66% of the calendar days between the first and last price
+    #  - late_start: the first price is after the start date (not checked for appended segments)
+    #  - stale_end: there is no price within the last 10 days
+    now = now or datetime.now()
+    has_prices = prices.last_valid >= 0
+
+    # gaps are filled with the last known close, so that consecutive rows give the change between known prices
+    with np.errstate(divide='ignore', invalid='ignore'):
+        changes = np.abs(prices.closes[1:] / prices.closes[:-1] - 1)
+    max_abs_change = np.fmax.reduce(changes, axis=0, initial=np.nan)  # ignores the NaN outside the known prices
+
+    first_dates, last_dates = prices.first_dates, prices.last_dates
+    num_prices = prices.is_observed.sum(axis=0)
+    calendar_days = (last_dates - first_dates).dt.days.to_numpy() + 1
+    completeness = num_prices / calendar_days
+
+    return pd.DataFrame({
+        'first_date': first_dates,
+        'last_date': last_dates,
+        'num_prices': num_prices,
+        'completeness': completeness,
+        'max_abs_change': max_abs_change,
+        'no_prices': ~has_prices,
+        'large_jump': max_abs_change > MAX_DAILY_CHANGE,
+        'incomplete': has_prices & (completeness < MIN_COMPLETENESS),
+        'late_start': check_start & (first_dates > start_date).to_numpy(),
+        'stale_end': has_prices & (last_dates < now - MAX_STALENESS).to_numpy(),
+    }, index=prices.tickers.rename('Ticker'))
+
+
 
 class StockPricesAPI:
-    def __init__(self, tickers: str, start_date: datetime):
+    def __init__(
+            self,
+            tickers: list[str],
+            start_date: datetime,
+            price_store: Optional[PriceStore] = None,
+            price_provider: Optional[PriceProvider] = None,
+            quarantine_flags: Iterable[str] = (),
+            ticker_resolver: Optional[TickerResolver] = None
+    ):
+        # with a ticker resolver, the tickers are requested with the symbols of the price provider and
+        # tickers known to have no prices are skipped
+        self.ticker_resolver = ticker_resolver
+        self.skipped_tickers = []
+        if ticker_resolver is not None:
+            tickers = list(dict.fromkeys(ticker_resolver.resolve(tickers)))
+            is_dead = ticker_resolver.is_dead(tickers)
+            self.skipped_tickers = [ticker for ticker, dead in zip(tickers, is_dead) if dead]
+            tickers = [ticker for ticker, dead in zip(tickers, is_dead) if not dead]
+            if len(self.skipped_tickers) > 0:
+                logger.info(f'Skipping {len(self.skipped_tickers)} tickers known to have no prices.')
+
         self.tickers = tickers
         self.start_date = start_date
+        self.price_store = price_store
+        self.price_provider = price_provider or YFinanceProvider()
+        # tickers failing any of these checks (see `VALIDATION_FLAGS`) are removed before the analytics run
+        self.quarantine_flags = list(quarantine_flags)
+        assert set(self.quarantine_flags).issubset(VALIDATION_FLAGS), f'Unknown flags {self.quarantine_flags}'
+
+        self.validation_report = None
+        self.quarantined_tickers = []
+        # reasons recorded by the price provider for tickers, for which no prices were downloaded
+        self.download_failures = dict()
+        cleaned_prices = self._get_cleaned_prices()
+
+        if len(self.tickers) > 0 and not (cleaned_prices.last_valid >= 0).any():
+            raise ValueError(f'No prices could be downloaded for any of the {len(self.tickers)} tickers, '
+                             f'failures by ticker: {self.download_failures}')
+
+        if ticker_resolver is not None:
+            # only tickers the provider has no prices for are skipped in the next runs, not those failing
+            # because of errors like rate limits
+            with_prices = set(cleaned_prices.tickers[cleaned_prices.last_valid >= 0])
+            ticker_resolver.mark_dead([
+                ticker for ticker in self.tickers
+                if ticker not in with_prices and self.download_failures.get(ticker, NO_PRICES) == NO_PRICES
+            ])
 
-        self._stock_prices = self._get_cleaned_prices()
+        self._stock_prices = self._quarantine_tickers(cleaned_prices)
 
     @property
-    def stock_prices(self):
+    def stock_prices(self) -> PricePanel:
         return self._stock_prices
 
-    def _validate_ticker_data(self, cleaned_prices):
+    @instrumented()
+    def _validate_ticker_data(self, cleaned_prices: PricePanel, check_start: bool = True) -> pd.DataFrame:
+        report = validate_price_panel(cleaned_prices, self.start_date, check_start)
 
-        for ticker, dataframe in cleaned_prices.items():
-            # Check for excessive price changes (defined as greater than 50%)
-            validation_frame = dataframe.copy()
-            validation_frame["pct_change"] = validation_frame["Close"].pct_change()  # Calculate percentage change
-            exceeds_change = (validation_frame["pct_change"].abs() > 0.5).any()
+        for ticker, row in report[report[VALIDATION_FLAGS].any(axis=1)].iterrows():
+            if row['no_prices']:
+                logger.info(f'The ticker for {ticker} has no prices.')
+                continue
 
-            # Check for data completeness
-            total_days = (validation_frame["Date"].max() - validation_frame["Date"].min()).days + 1
-            row_count = len(validation_frame)
-            is_complete = row_count >= 0.66 * total_days
-
-            if exceeds_change:
+            if row['large_jump']:
                 logger.info(f'Ticker for {ticker} has large jumps in the stock price by up to '
-                             f'{int(validation_frame["pct_change"].abs().max() * 100)}%.')
+                            f'{int(row["max_abs_change"] * 100)}%.')
 
-            if not is_complete:
+            if row['incomplete']:
                 logger.info(f'The ticker for {ticker} does seem to miss many days.')
 
-            if validation_frame["Date"].iloc[0] > self.start_date:
+            if row['late_start']:
                 logger.info(f'The ticker for {ticker} is starting later than wanted.')
 
-            if validation_frame["Date"].iloc[-1] < datetime.now() - timedelta(days=10):
+            if row['stale_end']:
                 logger.info(f'The ticker for {ticker} is missing recent data.')
 
-    def _download_data_from_yfinance(self) -> dict[str, pd.DataFrame]:
-        all_tickers = yf.download(
-            tickers=self.tickers,
-            start=self.start_date,
-            group_by='ticker',
-            progress=True,
+        return report
+
+    def _quarantine_tickers(self, cleaned_prices: PricePanel) -> PricePanel:
+        if len(self.quarantine_flags) == 0:
+            return cleaned_prices
+
+        failing = self.validation_report[self.validation_report[self.quarantine_flags].any(axis=1)]
+        self.quarantined_tickers = failing.index.tolist()
+        if len(failing) == 0:
+            return cleaned_prices
+
+        logger.info(f'Quarantining {len(failing)} tickers failing the checks {self.quarantine_flags}: '
+                    f'{self.quarantined_tickers}')
+        kept_tickers = cleaned_prices.tickers.difference(failing.index, sort=False)
+
+        return cleaned_prices.subset(kept_tickers, cleaned_prices.dates[0])
+
+    @instrumented()
+    def _download_prices(self, tickers: list[str], start_date: datetime) -> dict[str, pd.DataFrame]:
+        prices = self.price_provider.download(tickers, start_date)
+        self.download_failures.update(getattr(self.price_provider, 'failures', dict()))
+
+        return prices
+
+    @instrumented()
+    def _clean_stock_prices(self, raw_prices: dict[str, pd.DataFrame]) -> PricePanel:
+        # align the closing prices of all tickers on a common date axis
+        closes = (
+            pd.DataFrame({
+                ticker: stock_prices['Close']
+                for ticker, stock_prices in raw_prices.items()
+            })
+            .pipe(lambda df: df.set_axis(pd.to_datetime(df.index, errors='coerce'), axis=0))
+            .loc[lambda df: df.index.notna()]
+            .sort_index()
         )
-        ticker_dict = dict()
 
+        return PricePanel(closes.index, closes.columns, closes.to_numpy(dtype='float64'))
+
+    def _download_full_history(self, tickers: list[str]) -> None:
+        store = self.price_store
+        new_prices = {
+            ticker: prices.dropna(subset=['Close'])
+            for ticker, prices in self._download_prices(tickers, self.start_date).items()
+        }
+        for ticker, prices in new_prices.items():
+            store.replace(ticker, prices, self.start_date)
+
+        # validate that downloaded ticker data is consistent
+        self._validate_ticker_data(self._clean_stock_prices(new_prices))
+
+    @instrumented()
+    def _refresh_price_store(self) -> dict[str, pd.DataFrame]:
+        # Download only what is missing in the local price store: the full history of tickers, which are new
+        # (or stored from a later start date only), and the bars after the high-water mark of all others.
+        # The bars of the last days before the high-water mark are downloaded again: if they changed, e.g. as
+        # the closes were adjusted for a split since, the full history of the ticker is downloaded again
+        store = self.price_store
+        new_tickers = [
+            ticker for ticker in self.tickers
+            if ticker not in store or store.start_date(ticker) > self.start_date
+        ]
+
+        if len(new_tickers) > 0:
+            logger.info(f'Downloading the full price history of {len(new_tickers)} new tickers.')
+            self._download_full_history(new_tickers)
+
+        # group the stored tickers by their high-water mark, so that each download covers one date range only
+        tickers_by_high_water_mark = defaultdict(list)
         for ticker in self.tickers:
-            ticker_data = all_tickers[ticker].copy()
-            ticker_data['Ticker'] = ticker
-            ticker_dict[ticker] = ticker_data
-
-        return ticker_dict
-
-    def _clean_stock_prices(self, raw_prices: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
-        cleaned_data = dict()
-
-        for ticker, stock_prices in raw_prices.items():
-            cleaned_data[ticker] = (
-                stock_prices
-                .reset_index()  # move date from index to column
-                .assign(Date=lambda df: pd.to_datetime(df['Date'], errors='coerce'))
-                .loc[:, ['Ticker', 'Close', 'Date']]
-                .dropna()
+            if ticker not in new_tickers:
+                tickers_by_high_water_mark[store.high_water_mark(ticker)].append(ticker)
+
+        appended_segments = dict()
+        readjusted_tickers = []
+        for high_water_mark, tickers in tickers_by_high_water_mark.items():
+            if high_water_mark is not None and high_water_mark.date() >= datetime.now().date():
+                continue
+            refresh_from = self.start_date if high_water_mark is None else max(
+                high_water_mark - REFRESH_OVERLAP, self.start_date
             )
 
-        return cleaned_data
+            logger.info(f'Downloading prices of {len(tickers)} tickers from {refresh_from.date()} on.')
+            for ticker, prices in self._download_prices(tickers, refresh_from).items():
+                prices = prices.dropna(subset=['Close'])
+                if not store.matches_stored(ticker, prices):
+                    readjusted_tickers.append(ticker)
+                    continue
+
+                segment = store.append(ticker, prices)
+                if len(segment) > 0:
+                    appended_segments[ticker] = segment
+
+        if len(readjusted_tickers) > 0:
+            logger.info(f'Downloading the full price history of {len(readjusted_tickers)} tickers, whose stored '
+                        f'prices changed: {readjusted_tickers}')
+            self._download_full_history(readjusted_tickers)
+
+        # validate only the appended segments, the remaining history has been validated before
+        if len(appended_segments) > 0:
+            self._validate_ticker_data(self._clean_stock_prices(appended_segments), check_start=False)
+
+        return {
+            ticker: store.load(ticker).loc[lambda df: df.index >= self.start_date]
+            for ticker in self.tickers
+            if ticker in store
+        }
+
+    def _get_cleaned_prices(self) -> PricePanel:
+        if self.price_store is not None:
+            cleaned_prices = self._clean_stock_prices(self._refresh_price_store())
+            # the downloaded parts have been validated (and logged) while refreshing the store,
+            # the report covers the full history of all tickers
+            self.validation_report = validate_price_panel(cleaned_prices, self.start_date)
+            return cleaned_prices
 
-    def _get_cleaned_prices(self) -> dict[str, pd.DataFrame]:
-        raw_prices = self._download_data_from_yfinance()
+        raw_prices = self._download_prices(self.tickers, self.start_date)
         cleaned_prices = self._clean_stock_prices(raw_prices)
 
         # validate that downloaded ticker data is consistent
-        self._validate_ticker_data(cleaned_prices)
+        self.validation_report = self._validate_ticker_data(cleaned_prices)
 
         return cleaned_prices
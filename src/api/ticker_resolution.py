@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Symbol changes (old symbol, new symbol, date of the change): ratings published under the old symbol before
+# the change refer to the company trading under the new symbol, whose price history is provided under it.
+# Ratings under the old symbol from the date of the change on refer to another company reusing the symbol,
+# e.g. Enact Holdings trading as ACT since 2021.
+SYMBOL_CHANGES = [
+    ('ACT', 'AGN', datetime(2015, 6, 15)),  # Actavis renamed to Allergan
+    ('HRS', 'LHX', datetime(2019, 7, 1)),  # Harris merged with L3 Technologies
+    ('UTX', 'RTX', datetime(2020, 4, 3)),  # United Technologies merged with Raytheon
+    ('FB', 'META', datetime(2022, 6, 9)),
+    ('ANTM', 'ELV', datetime(2022, 6, 28)),  # Anthem renamed to Elevance Health
+    ('ABC', 'COR', datetime(2023, 8, 30)),  # AmerisourceBergen renamed to Cencora
+]
+
+# Symbols without any prices, e.g. of companies which were acquired
+DEAD_TICKERS = [
+    'AGN',  # Allergan, acquired by AbbVie in 2020
+]
+
+# exchange suffixes of the constituent lists and the suffixes used by the price provider
+EXCHANGE_SUFFIXES = {
+    'XSHG': 'SS',  # Shanghai Stock Exchange
+    'XSHE': 'SZ',  # Shenzhen Stock Exchange
+}
+
+# share classes are separated by a dot in the ratings and index lists (BRK.B) and by a dash at the provider (BRK-B)
+_SHARE_CLASS_PATTERN = r'^(?P<symbol>[A-Z]+)\.(?P<share_class>[A-C])$'
+
+NEGATIVE_CACHE_MAX_AGE = timedelta(days=30)
+
+
+def normalize_symbols(tickers: Iterable[str]) -> np.ndarray:
+    # Symbols in the conventions of the price provider: upper case, share classes separated by a dash and
+    # exchange suffixes of the provider. Each distinct symbol is only normalized once
+    codes, symbols = pd.factorize(pd.Series(tickers, dtype='string'), use_na_sentinel=True)
+    symbols = pd.Series(symbols, dtype='string').str.strip().str.upper()
+
+    symbols = symbols.str.replace(_SHARE_CLASS_PATTERN, r'\g<symbol>-\g<share_class>', regex=True)
+    for suffix, provider_suffix in EXCHANGE_SUFFIXES.items():
+        symbols = symbols.str.replace(rf'\.{suffix}$', f'.{provider_suffix}', regex=True)
+
+    normalized = np.full(len(codes), None, dtype=object)
+    normalized[codes >= 0] = symbols.to_numpy(dtype=object)[codes[codes >= 0]]
+
+    return normalized
+
+
+class TickerResolver:
+    # Resolves the symbols of ratings and price requests to the symbols of the price provider: normalizes the
+    # symbols, applies symbol changes by a hash lookup of the old symbol and the date of the change, and
+    # keeps a negative cache of symbols without prices. Symbols found without prices at the provider are
+    # persisted in `negative_cache_path` and skipped for `NEGATIVE_CACHE_MAX_AGE`, the `dead_tickers` always.
+    def __init__(
+            self,
+            symbol_changes: list[tuple[str, str, datetime]] = SYMBOL_CHANGES,
+            dead_tickers: Iterable[str] = DEAD_TICKERS,
+            negative_cache_path: Optional[str] = None
+    ):
+        old_symbols, new_symbols, change_dates = zip(*symbol_changes) if symbol_changes else ((), (), ())
+        self._old_symbols = pd.Index(normalize_symbols(old_symbols))
+        assert self._old_symbols.is_unique, 'Each symbol can only be changed once'
+        self._new_symbols = normalize_symbols(new_symbols)
+        self._change_dates = pd.DatetimeIndex(change_dates).to_numpy(dtype='datetime64[ns]')
+
+        self.dead_tickers = set(normalize_symbols(dead_tickers))
+        self.negative_cache_path = negative_cache_path
+        self._negative_cache = self._load_negative_cache()
+
+    def _load_negative_cache(self) -> dict[str, str]:
+        if self.negative_cache_path is None or not os.path.exists(self.negative_cache_path):
+            return dict()
+
+        with open(self.negative_cache_path) as file:
+            negative_cache = json.load(file)
+
+        # symbols are retried once their entry expired, e.g. after a transient failure of the provider
+        expired_before = (datetime.now() - NEGATIVE_CACHE_MAX_AGE).isoformat()
+        return {ticker: marked for ticker, marked in negative_cache.items() if marked >= expired_before}
+
+    def _save_negative_cache(self) -> None:
+        os.makedirs(os.path.dirname(self.negative_cache_path) or '.', exist_ok=True)
+        temporary_path = f'{self.negative_cache_path}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(self._negative_cache, file, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.negative_cache_path)
+
+    def resolve(self, tickers: Iterable[str], dates: Optional[Iterable] = None) -> np.ndarray:
+        # Provider symbols of the tickers, the symbol changes are only applied with the dates the tickers
+        # were used at (e.g. the publication dates of ratings). Chained changes are followed
+        symbols = normalize_symbols(tickers)
+        if dates is None or len(self._old_symbols) == 0:
+            return symbols
+
+        dates = pd.DatetimeIndex(dates).to_numpy(dtype='datetime64[ns]')
+        for _ in range(len(self._old_symbols)):
+            changes = self._old_symbols.get_indexer(symbols)
+            is_changed = changes >= 0
+            is_changed[is_changed] = dates[is_changed] < self._change_dates[changes[is_changed]]
+            if not is_changed.any():
+                break
+            symbols[is_changed] = self._new_symbols[changes[is_changed]]
+
+        return symbols
+
+    def is_dead(self, tickers: Iterable[str]) -> np.ndarray:
+        return pd.Index(normalize_symbols(tickers)).isin(self.dead_tickers | set(self._negative_cache))
+
+    def mark_dead(self, tickers: Iterable[str]) -> None:
+        # record symbols for which the provider has no prices
+        tickers = [ticker for ticker in normalize_symbols(tickers) if ticker not in self.dead_tickers]
+        if len(tickers) == 0 or self.negative_cache_path is None:
+            return
+
+        marked = datetime.now().isoformat()
+        self._negative_cache.update({ticker: marked for ticker in tickers})
+        self._save_negative_cache()
+        logger.info(f'Skipping {len(tickers)} tickers without prices in the next runs: {tickers}')
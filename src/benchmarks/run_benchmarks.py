@@ -0,0 +1,220 @@
+import argparse
+from datetime import datetime, timedelta
+import gc
+import glob
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from bs4 import BeautifulSoup
+import numpy as np
+import pandas as pd
+
+from src.analytics.accumulators import PerformanceAccumulator
+from src.analytics.performance import accumulate_performance_after_ratings, compute_performance_after_ratings, \
+    compute_performance_any_day, load_forward_returns
+from src.analytics.t_tests import perform_t_tests
+from src.api.data_loader import filter_ratings_without_stock_prices
+from src.api.price_providers import SyntheticPriceProvider
+from src.api.rating_loader import RatingAPI
+from src.api.stock_prices_loader import StockPricesAPI
+from src.benchmarks.synthetic_data import generate_analysis_page, generate_ratings, synthetic_tickers
+from src.rating_collecting.page_parser import collect_ratings_from_page
+
+logger = logging.getLogger(__name__)
+
+FROM_DATE = datetime(2014, 1, 1)
+TO_DATE = datetime(2024, 1, 1)
+
+
+def measure(stages: list[dict], name: str, num_rows: int, function: Callable[[], Any]) -> Any:
+    # run a single stage and record its wall time and the peak of memory allocated while it was running
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    result = function()
+
+    seconds = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stages.append({
+        'stage': name,
+        'rows': num_rows,
+        'seconds': round(seconds, 4),
+        'peak_memory_mb': round(peak_bytes / 2 ** 20, 2),
+    })
+    logger.info(f'{name}: {seconds:.3f} s, peak memory {peak_bytes / 2 ** 20:.1f} MB for {num_rows} rows')
+
+    return result
+
+
+def run_benchmarks(
+        num_tickers: int,
+        num_ratings: int,
+        performance_horizon: int,
+        seed: int,
+        block_size: int,
+        max_matrix_gb: float
+) -> dict:
+    stages = []
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        ratings_path = os.path.join(work_dir, 'ratings.csv')
+        generate_ratings(num_tickers, num_ratings, FROM_DATE, TO_DATE, seed).to_csv(ratings_path, index=False)
+
+        ratings = measure(stages, 'RatingAPI', num_ratings, lambda: RatingAPI(
+            from_time=FROM_DATE, to_time=TO_DATE, use_cache=False, file_path=ratings_path
+        ).ratings)
+
+    stock_prices = measure(stages, 'StockPricesAPI', num_tickers, lambda: StockPricesAPI(
+        tickers=synthetic_tickers(num_tickers),
+        start_date=FROM_DATE - timedelta(days=30),
+        price_provider=SyntheticPriceProvider(seed=seed),
+    ).stock_prices)
+
+    ratings, _ = measure(stages, 'filter_ratings_without_stock_prices', len(ratings), lambda: (
+        filter_ratings_without_stock_prices(ratings, stock_prices, performance_horizon)
+    ))
+
+    # the full forward-return matrix is only benchmarked if it fits into the memory budget
+    if len(ratings) * performance_horizon * 8 <= max_matrix_gb * 2 ** 30:
+        measure(stages, 'compute_performance_after_ratings', len(ratings), lambda: (
+            compute_performance_after_ratings(ratings, stock_prices, performance_horizon)
+        ))
+
+        # persisted forward returns: computed and written by the first, only looked up by the second call
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for stage_name in ['load_forward_returns (cold)', 'load_forward_returns (warm)']:
+                measure(stages, stage_name, len(ratings), lambda: (
+                    load_forward_returns(ratings, stock_prices, performance_horizon, cache_dir)
+                ))
+
+    performance_after_rating = measure(stages, 'accumulate_performance_after_ratings', len(ratings), lambda: (
+        accumulate_performance_after_ratings(ratings, stock_prices, performance_horizon, block_size)
+    ))
+
+    def accumulate_performance_any_day() -> PerformanceAccumulator:
+        accumulator = PerformanceAccumulator(performance_horizon)
+        for block_start in range(0, len(ratings), block_size):
+            accumulator.update(compute_performance_any_day(
+                ratings.iloc[block_start:block_start + block_size], stock_prices, performance_horizon,
+                seed=seed + block_start
+            ))
+        return accumulator
+
+    performance_after_rating['any day'] = measure(
+        stages, 'compute_performance_any_day', len(ratings), accumulate_performance_any_day
+    )
+
+    measure(stages, 'perform_t_tests', len(ratings), lambda: (
+        perform_t_tests(performance_after_rating, time_points=None, correction='holm')
+    ))
+
+    return {
+        'config': {
+            'num_tickers': num_tickers,
+            'num_ratings': num_ratings,
+            'performance_horizon': performance_horizon,
+            'seed': seed,
+            'block_size': block_size,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'processors': os.cpu_count(),
+        },
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'stages': stages,
+    }
+
+
+def _parse_full_page(page_content: str, ticker: str) -> list[tuple]:
+    # reference extraction parsing the whole page with BeautifulSoup's pure Python parser
+    cells = BeautifulSoup(page_content, 'html.parser').find_all('td', class_='yf-12wn017')
+    return [
+        (ticker, cells[i].get_text(strip=True), cells[i + 1].get_text(strip=True), cells[i + 2].get_text(strip=True))
+        for i in range(0, len(cells), 3)
+    ]
+
+
+def run_parse_benchmarks(num_pages: int, ratings_per_page: int, page_fixtures: Optional[str] = None) -> dict:
+    # Extraction of the ratings from analysis pages, either saved pages (`<ticker>.html` files in the
+    # directory `page_fixtures`) or synthetic ones
+    stages = []
+
+    if page_fixtures is not None:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(page_fixtures, '*.html'))):
+            with open(path, encoding='utf-8') as file:
+                pages.append((os.path.splitext(os.path.basename(path))[0], file.read()))
+    else:
+        pages = [
+            (ticker, generate_analysis_page(ticker, ratings_per_page, seed=seed))
+            for seed, ticker in enumerate(synthetic_tickers(num_pages))
+        ]
+    page_mb = sum(len(page) for _, page in pages) / 2 ** 20
+
+    reference = measure(stages, 'parse_full_page', len(pages), lambda: [
+        _parse_full_page(page, ticker) for ticker, page in pages
+    ])
+    ratings = measure(stages, 'collect_ratings_from_page', len(pages), lambda: [
+        collect_ratings_from_page(page, ticker) for ticker, page in pages
+    ])
+    assert ratings == reference, 'Extracted ratings differ from the full-page reference'
+
+    return {
+        'config': {
+            'num_pages': len(pages),
+            'page_fixtures': page_fixtures,
+            'page_mb': round(page_mb, 2),
+            'num_ratings': sum(len(ratings_of_page) for ratings_of_page in ratings),
+        },
+        'stages': stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ratings-to-performance pipeline on synthetic data.')
+    parser.add_argument('--tickers', type=int, default=500, help='number of synthetic tickers')
+    parser.add_argument('--ratings', type=int, default=50_000, help='number of synthetic ratings')
+    parser.add_argument('--horizon', type=int, default=240, help='performance horizon in trading days')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--block-size', type=int, default=10_000, help='ratings per block of streamed stages')
+    parser.add_argument('--max-matrix-gb', type=float, default=2.0,
+                        help='skip stages materializing the full forward-return matrix above this size')
+    parser.add_argument('--pages', type=int, default=10, help='number of synthetic analysis pages to parse')
+    parser.add_argument('--ratings-per-page', type=int, default=500)
+    parser.add_argument('--page-fixtures', default=None,
+                        help='directory of saved analysis pages (<ticker>.html) to parse instead of synthetic ones')
+    parser.add_argument('--output', default='benchmark_report.json', help='path of the JSON report')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('src').setLevel(logging.WARNING)  # e.g. per-ticker validation messages of synthetic data
+
+    report = run_benchmarks(
+        num_tickers=args.tickers,
+        num_ratings=args.ratings,
+        performance_horizon=args.horizon,
+        seed=args.seed,
+        block_size=args.block_size,
+        max_matrix_gb=args.max_matrix_gb,
+    )
+    report['page_parsing'] = run_parse_benchmarks(args.pages, args.ratings_per_page, args.page_fixtures)
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    logger.info(f'Wrote benchmark report to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
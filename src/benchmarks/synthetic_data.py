@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.api.rating_mapping import rating_mapping
+
+RATERS = [
+    'Morgan Stanley', 'Goldman Sachs', 'JP Morgan', 'B of A Securities', 'Citigroup', 'Wells Fargo',
+    'Barclays', 'UBS', 'Deutsche Bank', 'Credit Suisse', 'RBC Capital', 'Jefferies', 'Piper Sandler',
+    'Raymond James', 'Evercore ISI Group', 'Mizuho', 'Bernstein', 'Wolfe Research', 'KeyBanc', 'Stifel',
+]
+CHANGES = ['Maintains', 'Upgrade', 'Downgrade', 'Initiated', 'Reiterates']
+CHANGE_PROBABILITIES = [0.67, 0.11, 0.11, 0.08, 0.03]
+
+
+def synthetic_tickers(num_tickers: int) -> list[str]:
+    return [f'T{i:05d}' for i in range(num_tickers)]
+
+
+def generate_ratings(
+        num_tickers: int,
+        num_ratings: int,
+        from_date: datetime,
+        to_date: datetime,
+        seed: int = 0
+) -> pd.DataFrame:
+    # Deterministic raw ratings in the format of the collected rating file (columns 'Ticker', 'Change',
+    # 'Text' and 'Date'), e.g. 'Barclays: Underweight to Equal-Weight' published on '11/27/2019'
+    generator = np.random.default_rng(seed)
+    rating_texts = np.array(list(rating_mapping.keys()), dtype=object)
+
+    raters = np.array(RATERS, dtype=object)[generator.integers(0, len(RATERS), num_ratings)]
+    to_ratings = rating_texts[generator.integers(0, len(rating_texts), num_ratings)]
+    from_ratings = rating_texts[generator.integers(0, len(rating_texts), num_ratings)]
+    has_from_rating = generator.random(num_ratings) < 0.45
+    texts = raters + ': ' + np.where(has_from_rating, from_ratings + ' to ' + to_ratings, to_ratings)
+
+    num_days = (to_date - from_date).days
+    dates = pd.Series(pd.Timestamp(from_date) + pd.to_timedelta(generator.integers(0, num_days, num_ratings), 'D'))
+
+    return pd.DataFrame({
+        'Ticker': np.array(synthetic_tickers(num_tickers), dtype=object)[generator.integers(0, num_tickers, num_ratings)],
+        'Change': generator.choice(CHANGES, size=num_ratings, p=CHANGE_PROBABILITIES),
+        'Text': texts,
+        'Date': (
+            dates.dt.month.astype(str) + '/' + dates.dt.day.astype(str) + '/' + dates.dt.year.astype(str)
+        ).to_numpy(),
+    })
+
+
+def generate_analysis_page(ticker: str, num_ratings: int, padding_kb: int = 500, seed: int = 0) -> str:
+    # Deterministic HTML page resembling an analysis page: scripts, styles and unrelated tables around
+    # the ratings table, whose cells of class 'yf-12wn017' come in triplets of change, text and date
+    ratings = generate_ratings(1, num_ratings, datetime(2014, 1, 1), datetime(2024, 1, 1), seed)
+    padding_blocks = [
+        f'<div class="row r{i}"><span>{i}</span><script>var data{i} = "{"x" * 200}";</script></div>'
+        for i in range(padding_kb * 1024 // 260)
+    ]
+    header, footer = ''.join(padding_blocks[::2]), ''.join(padding_blocks[1::2])
+    other_table = ''.join(f'<tr><td class="yf-other">{i}</td><td>{i * 2}</td></tr>' for i in range(200))
+    rating_rows = ''.join(
+        f'<tr class="yf-12wn017"><td class="yf-12wn017">{change}</td>'
+        f'<td class="yf-12wn017"><span>{text}</span></td><td class="yf-12wn017">{date}</td></tr>'
+        for change, text, date in zip(ratings['Change'], ratings['Text'], ratings['Date'])
+    )
+
+    return (
+        f'<html><head><title>{ticker} analysis</title><style>.yf-12wn017 {{ padding: 0; }}</style></head>'
+        f'<body>{header}<table>{other_table}</table>'
+        f'<table><thead><tr><th>Action</th><th>Rating</th><th>Date</th></tr></thead>'
+        f'<tbody>{rating_rows}</tbody></table>{footer}</body></html>'
+    )
@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation is disabled by default. It can be enabled by setting the environment variable
+# STOCK_RATINGS_TRACE to the path of a JSON lines trace file or by calling `enable_instrumentation`.
+_enabled = 'STOCK_RATINGS_TRACE' in os.environ
+_trace_path = os.environ.get('STOCK_RATINGS_TRACE') or None
+_records = []
+_active_stages = []
+
+
+def enable_instrumentation(trace_path: Optional[str] = None) -> None:
+    global _enabled, _trace_path
+    _enabled = True
+    _trace_path = trace_path
+
+
+def disable_instrumentation() -> None:
+    global _enabled
+    _enabled = False
+
+
+def get_trace() -> list[dict]:
+    # records of all stages finished in this process so far
+    return list(_records)
+
+
+def _max_rss_mb() -> Optional[float]:
+    # peak resident set size of the process so far (reported in kilobytes on Linux, in bytes on macOS),
+    # None on platforms without the `resource` module, e.g. Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return max_rss / 2 ** 20 if sys.platform == 'darwin' else max_rss / 2 ** 10
+
+
+def _count_rows(result) -> Optional[int]:
+    if isinstance(result, tuple) and len(result) > 0:
+        result = result[0]
+    if isinstance(result, dict):
+        return sum(_count_rows(value) or 0 for value in result.values())
+    if hasattr(result, '__len__') and not isinstance(result, str):
+        return len(result)
+
+    return None
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None) -> Iterator[dict]:
+    # Record wall time, CPU time, number of rows and peak memory of a pipeline stage. The yielded record
+    # can be updated within the stage, e.g. with the number of rows once it is known
+    if not _enabled:
+        yield dict()
+        return
+
+    record = {
+        'stage': name,
+        'parent': _active_stages[-1] if _active_stages else None,
+        'rows': rows,
+        'pid': os.getpid(),
+    }
+    _active_stages.append(name)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+
+    try:
+        yield record
+    finally:
+        _active_stages.pop()
+        record['wall_seconds'] = round(time.perf_counter() - wall_start, 6)
+        record['cpu_seconds'] = round(time.process_time() - cpu_start, 6)
+        max_rss_mb = _max_rss_mb()
+        record['max_rss_mb'] = round(max_rss_mb, 1) if max_rss_mb is not None else None
+        _records.append(record)
+
+        logger.info(json.dumps(record))
+        if _trace_path is not None:
+            # one JSON object per line, so that worker processes can append to the same trace
+            with open(_trace_path, 'a') as file:
+                file.write(json.dumps(record) + '\n')
+
+
+def instrumented(name: Optional[str] = None) -> Callable:
+    # decorator recording each call of a function as a stage, the number of rows is taken from its result
+    def decorator(function: Callable) -> Callable:
+        stage_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+
+            with stage(stage_name) as record:
+                result = function(*args, **kwargs)
+                record['rows'] = _count_rows(result)
+
+            return result
+
+        return wrapper
+
+    return decorator
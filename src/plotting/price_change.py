@@ -1,11 +1,12 @@
 import datetime
+from typing import Optional
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
 
-def plot_mean_performance(dataframes: dict[str, pd.DataFrame], col_to_plot: str):
+def plot_mean_performance(dataframes: dict[str, pd.DataFrame], col_to_plot: str, output_path: Optional[str] = None):
 
     fig, ax = plt.subplots(figsize=(10, 6))
     colors = {
@@ -43,6 +44,12 @@ def plot_mean_performance(dataframes: dict[str, pd.DataFrame], col_to_plot: str)
     ax.set_xlabel('Trading Days', fontsize=12)
     ax.set_ylabel('Price Change in %', fontsize=12)
 
+    if output_path is not None:
+        # headless mode: only write the figure
+        fig.savefig(output_path)
+        plt.close(fig)
+        return
+
     fig_name = f'{datetime.datetime.now().strftime("%H_%M_%S")}.png'
     plt.savefig(fig_name)
 
@@ -0,0 +1,57 @@
+import re
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # fall back to BeautifulSoup's pure Python parser
+    lxml = None
+
+# ratings are expected to be in table td objects with class 'yf-12wn017',
+# three cells per rating: change, text and date
+RATING_CELL_CLASS = 'yf-12wn017'
+_RATING_CELL_PATTERN = re.compile(r'<td\b[^>]*\bclass=["\'][^"\']*\b' + RATING_CELL_CLASS + r'\b')
+
+
+def _slice_ratings_table(page_content: str) -> Optional[str]:
+    # Only the HTML from the table of the first to the end of the table of the last rating cell is parsed,
+    # which is a small part of an analysis page. None if the page contains no rating cells
+    cells = list(_RATING_CELL_PATTERN.finditer(page_content))
+    if len(cells) == 0:
+        return None
+
+    table_start = page_content.rfind('<table', 0, cells[0].start())
+    table_end = page_content.find('</table>', cells[-1].end())
+    start = table_start if table_start >= 0 else cells[0].start()
+    end = table_end + len('</table>') if table_end >= 0 else len(page_content)
+
+    return page_content[start:end]
+
+
+def extract_rating_cells(page_content: str) -> list[str]:
+    # stripped text of all rating cells in document order
+    table = _slice_ratings_table(page_content)
+    if table is None:
+        return []
+
+    if lxml is not None:
+        cells = lxml.html.fromstring(table).xpath(
+            f'//td[contains(concat(" ", normalize-space(@class), " "), " {RATING_CELL_CLASS} ")]'
+        )
+        return [''.join(text.strip() for text in cell.itertext()) for cell in cells]
+
+    soup = BeautifulSoup(table, 'html.parser')
+    return [cell.get_text(strip=True) for cell in soup.find_all('td', class_=RATING_CELL_CLASS)]
+
+
+def collect_ratings_from_page(page_content: str, ticker: str) -> list[tuple]:
+    cells = extract_rating_cells(page_content)
+    if len(cells) % 3 != 0:
+        raise ValueError(f'Found {len(cells)} rating cells for ticker {ticker}, expected triplets of change, '
+                         f'text and date')
+
+    return [
+        (ticker, classification, text, date)
+        for classification, text, date in zip(cells[0::3], cells[1::3], cells[2::3])
+    ]
@@ -1,45 +1,48 @@
 
+import argparse
+import asyncio
 import csv
 import os
+import shutil
+from typing import Optional
 
 import pandas as pd
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
 
-from src.rating_collecting.index_lists import SP_500_2013
+from src.rating_collecting import index_lists
+from src.rating_collecting.page_parser import collect_ratings_from_page
 
+BASE_URL = "https://finance.yahoo.com/quote"
+OUTPUT_FILE = os.path.join('data', 'ratings_SP500_2013.csv')
+CSV_HEADER = ["Ticker", "Change", "Text", "Date"]
 
-def collect_ratings_from_page(page_content, ticker: str) -> list[tuple]:
-    # ratings are expected to be in table td objects with id 'yf-12wn017'
-    soup = BeautifulSoup(page_content, 'html.parser')
-    td_elements = soup.find_all("td", class_="yf-12wn017")
-    ratings_list = []
 
-    for i in range(0, len(td_elements), 3):
-        classification = td_elements[i].get_text(strip=True)
-        text = td_elements[i + 1].get_text(strip=True)
-        date = td_elements[i + 2].get_text(strip=True)
-        ratings_list.append((ticker, classification, text, date))
-
-    return ratings_list
+def write_to_csv(data: list[tuple], output_file: str = OUTPUT_FILE):
+    with open(output_file, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(data)
 
 
-def write_to_csv(data: list[tuple]):
-    output_file = os.path.join('data', 'ratings_SP500_2013.csv')
-    with open(output_file, mode="w", newline="", encoding="utf-8") as file:
+def append_to_csv(data: list[tuple], output_file: str = OUTPUT_FILE):
+    # append the ratings of a ticker as soon as they are collected, the header is written with the first rows
+    write_header = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+    with open(output_file, mode="a", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
-        writer.writerow(["Ticker", "Change", "Text", "Date"])
+        if write_header:
+            writer.writerow(CSV_HEADER)
         writer.writerows(data)
 
 
-def collect_ratings_for_tickers(tickers: str) -> list[tuple]:
+def collect_ratings_for_tickers(tickers: list[str]) -> list[tuple]:
+    from playwright.sync_api import sync_playwright
+
     all_ratings = []
 
     with sync_playwright() as p:
         # Launch a browser and go to main page
         browser = p.chromium.launch(headless=False)  # Set headless=True for no GUI
         page = browser.new_page()
-        main_url = f"https://finance.yahoo.com/quote"
+        main_url = BASE_URL
         page.goto(main_url)
 
         # Wait for the cookie banner to appear and click "Reject All" button
@@ -72,18 +75,201 @@ def collect_ratings_for_tickers(tickers: str) -> list[tuple]:
                 print("Load more button not found or timeout:", e)
                 continue
 
-            ratings_for_ticker = collect_ratings_from_page(page_content, ticker)
-            if isinstance(ratings_for_ticker, list):
-                all_ratings.extend(ratings_for_ticker)
-                print(f'Found {len(ratings_for_ticker)} ratings for ticker {ticker}')
+            try:
+                ratings_for_ticker = collect_ratings_from_page(page_content, ticker)
+            except ValueError as e:
+                print("Incomplete ratings table:", e)
+                continue
+
+            all_ratings.extend(ratings_for_ticker)
+            print(f'Found {len(ratings_for_ticker)} ratings for ticker {ticker}')
 
         browser.close()
 
     return all_ratings
 
-#old = pd.read_csv('old_SP500.csv')
-#old = old[old['t2'] == '2012-12-31']
-#print(*old['ticker'].to_list(), sep='",\n"')
+def _resume_from_checkpoint(partial_file: str, checkpoint_file: str) -> set[str]:
+    # Tickers listed in the checkpoint file are complete. Ratings of other tickers in the partial file
+    # were written by an interrupted run (before their ticker was checkpointed) and are collected again.
+    # Without a checkpoint, the run starts over with an empty partial file
+    if not os.path.exists(checkpoint_file):
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+        return set()
+
+    with open(checkpoint_file, encoding="utf-8") as file:
+        completed_tickers = {line.strip() for line in file if line.strip()}
+
+    if os.path.exists(partial_file) and os.path.getsize(partial_file) > 0:
+        collected = pd.read_csv(partial_file, dtype=str, keep_default_na=False)
+        collected[collected['Ticker'].isin(completed_tickers)].to_csv(partial_file, index=False)
+
+    return completed_tickers
+
+
+def _publish_partial_file(partial_file: str, output_file: str, checkpoint_file: str, is_complete: bool):
+    # Replace the output file by the ratings collected so far, the output file is never touched before
+    # ratings were collected. Once all tickers are complete, the next run starts over
+    if not os.path.exists(partial_file) or os.path.getsize(partial_file) == 0:
+        print(f"No ratings collected, {output_file} is left unchanged.")
+        return
+
+    temporary_file = output_file + ".tmp"
+    shutil.copyfile(partial_file, temporary_file)
+    os.replace(temporary_file, output_file)
+
+    if is_complete:
+        os.remove(partial_file)
+        os.remove(checkpoint_file)
+
+
+async def _reject_cookies(page, base_url: str):
+    await page.goto(base_url)
+
+    # Wait for the cookie banner to appear and click "Reject All" button
+    try:
+        reject_button_selector = "button.btn.secondary.reject-all"
+        await page.wait_for_selector(reject_button_selector, timeout=5000)
+        await page.click(reject_button_selector)
+        print("Rejected cookies.")
+
+    except Exception as e:
+        print("Cookie banner not opened or reject all button not found or timeout:", e)
+
+
+async def _collect_ratings_for_ticker(page, ticker: str, base_url: str) -> list[tuple]:
+    # go to the analysis page of the ticker, extend the ratings, and copy the entries in the rating table
+    await page.goto(f"{base_url}/{ticker}/analysis/")
+    await page.wait_for_load_state("networkidle", timeout=10000)
+
+    button_selector = 'button.tertiary-btn.fin-size-small'
+    await page.wait_for_selector(button_selector, timeout=10000)
+    await page.click(button_selector)
+
+    await page.wait_for_load_state("networkidle", timeout=10000)
+
+    return collect_ratings_from_page(await page.content(), ticker)
+
+
+async def _scrape_tickers(
+        pages: list,
+        tickers: list[str],
+        base_url: str,
+        output_file: str,
+        checkpoint_file: str,
+        max_retries: int,
+        backoff_seconds: float
+) -> list[str]:
+    # Each page takes the next ticker from a shared queue. The ratings of a ticker are appended to the output
+    # file before the ticker is checkpointed, writes do not interleave as they do not await
+    queue = asyncio.Queue()
+    for ticker in tickers:
+        queue.put_nowait(ticker)
+    failed_tickers = []
+
+    async def worker(page):
+        while not queue.empty():
+            ticker = queue.get_nowait()
+
+            for attempt in range(max_retries + 1):
+                try:
+                    ratings_for_ticker = await _collect_ratings_for_ticker(page, ticker, base_url)
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        print(f"Giving up on ticker {ticker} after {max_retries + 1} attempts:", e)
+                        failed_tickers.append(ticker)
+                        ratings_for_ticker = None
+                    else:
+                        delay = backoff_seconds * 2 ** attempt
+                        print(f"Load more button not found or timeout for ticker {ticker}, "
+                              f"retrying in {delay:.0f}s:", e)
+                        await asyncio.sleep(delay)
+
+            if ratings_for_ticker is None:
+                continue
+
+            append_to_csv(ratings_for_ticker, output_file)
+            with open(checkpoint_file, mode="a", encoding="utf-8") as file:
+                file.write(ticker + "\n")
+            print(f'Found {len(ratings_for_ticker)} ratings for ticker {ticker}')
+
+    await asyncio.gather(*(worker(page) for page in pages))
+
+    return failed_tickers
+
+
+async def collect_ratings_for_tickers_async(
+        tickers: list[str],
+        output_file: str = OUTPUT_FILE,
+        checkpoint_file: Optional[str] = None,
+        num_pages: int = 4,
+        base_url: str = BASE_URL,
+        max_retries: int = 2,
+        backoff_seconds: float = 5.0,
+        headless: bool = True
+) -> list[str]:
+    # Collect the ratings with several concurrent pages, appending them ticker by ticker to a partial file,
+    # which replaces `output_file` at the end of the run. Completed tickers are recorded in the checkpoint file,
+    # so that an interrupted run resumes where it stopped. `base_url` can point to a local server with saved
+    # pages, e.g. for testing. Returns the failed tickers.
+    from playwright.async_api import async_playwright
+
+    partial_file = output_file + '.partial'
+    checkpoint_file = checkpoint_file or output_file + '.checkpoint'
+    completed_tickers = _resume_from_checkpoint(partial_file, checkpoint_file)
+    remaining_tickers = [ticker for ticker in dict.fromkeys(tickers) if ticker not in completed_tickers]
+    print(f'{len(completed_tickers)} tickers already collected, {len(remaining_tickers)} remaining.')
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        # pages of one context share the cookies, so the banner has to be rejected once only
+        context = await browser.new_context()
+        pages = [await context.new_page() for _ in range(min(num_pages, max(len(remaining_tickers), 1)))]
+        await _reject_cookies(pages[0], base_url)
+
+        failed_tickers = await _scrape_tickers(
+            pages, remaining_tickers, base_url, partial_file, checkpoint_file, max_retries, backoff_seconds
+        )
+
+        await browser.close()
+
+    _publish_partial_file(partial_file, output_file, checkpoint_file, is_complete=len(failed_tickers) == 0)
+
+    return failed_tickers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Collect analyst ratings from the analysis pages of Yahoo Finance.')
+    parser.add_argument('--index-list', default='SP_500_2013', choices=index_lists.list_names(),
+                        help='constituent list with the tickers to collect')
+    parser.add_argument('--tickers', nargs='+', help='collect these tickers instead of a constituent list')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='CSV file the ratings are written to')
+    parser.add_argument('--pages', type=int, default=4, help='number of browser pages scraping concurrently')
+    parser.add_argument('--base-url', default=BASE_URL, help='e.g. a local server with saved analysis pages')
+    parser.add_argument('--retries', type=int, default=2, help='retries per ticker')
+    parser.add_argument('--show-browser', action='store_true', help='run the browser with a GUI')
+    parser.add_argument('--sync', action='store_true',
+                        help='collect all tickers with a single page and write the ratings at the end')
+    args = parser.parse_args()
+
+    tickers = args.tickers or index_lists.get_constituents(args.index_list)
+
+    if args.sync:
+        write_to_csv(collect_ratings_for_tickers(tickers), args.output)
+        return
+
+    failed = asyncio.run(collect_ratings_for_tickers_async(
+        tickers,
+        output_file=args.output,
+        num_pages=args.pages,
+        base_url=args.base_url,
+        max_retries=args.retries,
+        headless=not args.show_browser,
+    ))
+    if len(failed) > 0:
+        print(f'No ratings collected for {len(failed)} tickers, run again to retry: {failed}')
+
 
-all_ratings = collect_ratings_for_tickers(SP_500_2013)
-write_to_csv(all_ratings)
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,23 @@
-
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import os
+from typing import Optional
+
+import matplotlib
+matplotlib.use('Agg')  # experiments run headless, figures are written to the output directory
+
+import numpy as np
+import pandas as pd
 
+from src.api import cache
 from src.api.data_loader import load_historic_ratings_and_prices
+from src.api.index_membership import INDEX_SNAPSHOTS
+from src.api.price_panel import PricePanel
 from src.analytics.t_tests import perform_t_tests
-from src.analytics.performance import compute_performance_after_ratings, compute_mean_performance_after_rating, \
-    compute_performance_any_day
+from src.analytics.performance import compute_forward_returns, compute_mean_performance_after_rating, \
+    compute_performance_any_day, load_forward_returns, split_by_label
+from src.instrumentation import enable_instrumentation
 from src.plotting.price_change import plot_mean_performance
 
 logging.basicConfig(level=logging.INFO)
@@ -15,53 +28,173 @@ TO_YEAR = 2024
 PERFORMANCE_HORIZON = 240
 
 
-def perform_experiment(ratings, stock_prices):
+def assign_rating_text(rolling_mean: pd.Series) -> np.ndarray:
+    return np.where(rolling_mean > 1.5, 'Buy', np.where(rolling_mean >= 1, 'Hold', 'Sell'))
+
+
+# Experiments only differ by the ratings they select and how they label them, thus all of them
+# share the forward returns computed once for all ratings
+EXPERIMENTS = {
+    # Experiment 1: ratings as individual signal
+    'all_ratings': {
+        'select': lambda ratings: np.ones(len(ratings), dtype=bool),
+        'label': lambda ratings: ratings['Rating_text'].to_numpy(),
+    },
+    # Experiment 2: ratings as individual signal, but only those which suggest a change
+    'change_ratings': {
+        'select': lambda ratings: ratings['Change'].isin(['Maintains', 'Upgrade', 'Downgrade']).to_numpy(),
+        'label': lambda ratings: ratings['Change'].to_numpy(),
+    },
+    # Experiment 3: ratings as aggregated signal
+    'aggregated_ratings': {
+        'select': lambda ratings: (ratings['Rolling_mean_count'] >= 5).to_numpy(),
+        'label': lambda ratings: assign_rating_text(ratings['Rolling_mean']),
+    },
+    # Experiment 4: ratings from specific institutions only
+    'morgan_stanley': {
+        'select': lambda ratings: (ratings['Rater'] == 'Morgan Stanley').to_numpy(),
+        'label': lambda ratings: ratings['Rating_text'].to_numpy(),
+    },
+}
+
+
+def perform_experiment(
+        name: str,
+        ratings: pd.DataFrame,
+        forward_returns: np.ndarray,
+        labels: np.ndarray,
+        stock_prices: PricePanel,
+        output_dir: str
+) -> str:
     # print some statistics about the ratings
-    logger.info('Rating overview')
+    logger.info(f'Rating overview for experiment {name}')
     logger.info(f' Ratings by {len(list(ratings["Ticker"].unique()))} companies')
     logger.info(ratings['Rating_numeric'].value_counts())
     logger.info(ratings['Rater'].value_counts().head(10))
 
     # computation
-    performance_after_rating = compute_performance_after_ratings(ratings, stock_prices, PERFORMANCE_HORIZON)
-    performance_after_rating['any day'] = compute_performance_any_day(ratings, stock_prices, PERFORMANCE_HORIZON)
+    performance_after_rating = split_by_label(forward_returns, labels)
+    performance_after_rating['any day'] = compute_performance_any_day(
+        ratings, stock_prices, forward_returns.shape[1]
+    )
     mean_performance_after_rating = compute_mean_performance_after_rating(performance_after_rating)
 
     # results
-    plot_mean_performance(mean_performance_after_rating, 'mean')
-    perform_t_tests(performance_after_rating)
-
-
-# load data: ratings and stock prices
-ratings, stock_prices = load_historic_ratings_and_prices(
-    from_year=FROM_YEAR,
-    to_year=TO_YEAR,
-    performance_horizon=PERFORMANCE_HORIZON,
-    load_from_cache=True
-)
-
-# Experiment 1: ratings as individual signal
-perform_experiment(ratings, stock_prices)
-
-# Experiment 2: ratings as individual signal, but only those which suggest a change
-change_ratings = ratings[ratings['Change'].isin(['Maintains', 'Upgrade', 'Downgrade'])].copy()
-change_ratings["Rating_text"] = change_ratings["Change"]
-perform_experiment(change_ratings, stock_prices)
-
-# Experiment 3: ratings as aggregated signal
-def assign_rating_text(rolling_mean):
-    if rolling_mean > 1.5:
-        return "Buy"
-    elif 1 <= rolling_mean < 1.5:
-        return "Hold"
+    experiment_dir = os.path.join(output_dir, name)
+    os.makedirs(experiment_dir, exist_ok=True)
+    pd.DataFrame({
+        label: performances['mean'] for label, performances in mean_performance_after_rating.items()
+    }).to_csv(os.path.join(experiment_dir, 'mean_performance.csv'), index_label='day')
+    plot_mean_performance(
+        mean_performance_after_rating, 'mean', output_path=os.path.join(experiment_dir, 'mean_performance.png')
+    )
+    # t-tests on the day after the rating and on the last day of the performance horizon
+    perform_t_tests(
+        performance_after_rating, time_points=[1, forward_returns.shape[1] - 1], correction='holm'
+    ).to_csv(
+        os.path.join(experiment_dir, 't_tests.csv'), index=False
+    )
+
+    return experiment_dir
+
+
+def _perform_experiment_on_cached_returns(
+        name: str,
+        ratings: pd.DataFrame,
+        forward_returns_dir: str,
+        rows: np.ndarray,
+        labels: np.ndarray,
+        stock_prices: PricePanel,
+        output_dir: str
+) -> str:
+    # open the cached forward returns in the worker, so that only the rows of the experiment are read
+    _, forward_returns = cache.load_forward_returns(forward_returns_dir)
+
+    return perform_experiment(name, ratings, forward_returns[rows], labels, stock_prices, output_dir)
+
+
+def run_experiments(
+        experiment_names: list[str],
+        from_year: int,
+        to_year: int,
+        performance_horizon: int,
+        output_dir: str,
+        max_workers: int,
+        load_from_cache: bool = True,
+        indices: Optional[list[str]] = None
+) -> None:
+    # load data: ratings and stock prices
+    ratings, stock_prices = load_historic_ratings_and_prices(
+        from_year=from_year,
+        to_year=to_year,
+        performance_horizon=performance_horizon,
+        load_from_cache=load_from_cache,
+        indices=indices
+    )
+
+    # with the cache, the forward returns of earlier runs are reused and read by the workers from the
+    # memory-mapped file, instead of sending each experiment its forward returns
+    if load_from_cache:
+        _, rows = load_forward_returns(ratings, stock_prices, performance_horizon)
+        forward_returns_dir = cache.forward_returns_dir(performance_horizon, stock_prices.fingerprint)
     else:
-        return "Sell"
-
-
-aggregated_ratings = ratings[ratings['Rolling_mean_count'] >= 5].copy()
-aggregated_ratings['rating_text'] = aggregated_ratings['Rolling_mean'].apply(assign_rating_text)
-perform_experiment(aggregated_ratings, stock_prices)
-
-# Experiment 4: ratings from specific institutions only
-ratings_from_rater = ratings[ratings['Rater'] == "Morgan Stanley"].copy()
-perform_experiment(ratings_from_rater, stock_prices)
+        forward_returns, _ = compute_forward_returns(ratings, stock_prices, performance_horizon)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for name in experiment_names:
+            is_selected = EXPERIMENTS[name]['select'](ratings)
+            selected_ratings = ratings[is_selected]
+            labels = EXPERIMENTS[name]['label'](selected_ratings)
+
+            if load_from_cache:
+                futures.append(executor.submit(
+                    _perform_experiment_on_cached_returns, name, selected_ratings, forward_returns_dir,
+                    rows[is_selected], labels, stock_prices, output_dir,
+                ))
+            else:
+                futures.append(executor.submit(
+                    perform_experiment, name, selected_ratings, forward_returns[is_selected], labels, stock_prices,
+                    output_dir,
+                ))
+
+        for future in futures:
+            logger.info(f'Wrote results to {future.result()}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze the stock performance after analyst ratings.')
+    parser.add_argument('experiments', nargs='*',
+                        help=f'experiments to run out of {", ".join(EXPERIMENTS)} (default: all)')
+    parser.add_argument('--from-year', type=int, default=FROM_YEAR)
+    parser.add_argument('--to-year', type=int, default=TO_YEAR)
+    parser.add_argument('--horizon', type=int, default=PERFORMANCE_HORIZON, help='performance horizon in trading days')
+    parser.add_argument('--output-dir', default='results')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of experiments run in parallel')
+    parser.add_argument('--no-cache', action='store_true', help='recompute ratings and stock prices')
+    parser.add_argument('--indices', nargs='+', choices=list(INDEX_SNAPSHOTS), metavar='INDEX',
+                        help='only analyze ratings of point-in-time constituents of these indices')
+    parser.add_argument('--trace', help='write timing and memory of each pipeline stage to this JSON lines file')
+    args = parser.parse_args()
+
+    unknown_experiments = set(args.experiments) - set(EXPERIMENTS)
+    if unknown_experiments:
+        parser.error(f'unknown experiments: {", ".join(sorted(unknown_experiments))}')
+
+    if args.trace is not None:
+        enable_instrumentation(args.trace)
+
+    run_experiments(
+        experiment_names=args.experiments or list(EXPERIMENTS),
+        from_year=args.from_year,
+        to_year=args.to_year,
+        performance_horizon=args.horizon,
+        output_dir=args.output_dir,
+        max_workers=args.workers,
+        load_from_cache=not args.no_cache,
+        indices=args.indices,
+    )
+
+
+if __name__ == '__main__':
+    main()